@@ -173,7 +173,7 @@ if __name__ == '__main__':
     with open(csv_file) as csvfile:
         individual = timetable_from_list(
             list(csv.reader(csvfile, delimiter=',')),
-            campers, acts, sessions)
+            campers, acts, sessions, index=data_cache.index)
 
     BINGO_NAMES = [('Flag Flyer', 5),
                    ('Cliff Hangers', 5),
@@ -2,11 +2,12 @@
 
 Example:
   stdbuf -oL -eL python -m scoop -n 8 python -m family_camp/schedule/__main__.py outdir
+  python -m family_camp.schedule generate --backend=process --workers=8 outdir
 
 Usage:
-  schedule.py [-d|--debug] generate <outdir>
-  schedule.py [-d|--debug] generate <timetable> <outdir>
+  schedule.py [-d|--debug] generate [options] [--import=<csv>]... (<timetable> <outdir> | <outdir>)
   schedule.py [-d|--debug] check <timetable> <outdir>
+  schedule.py [-d|--debug] solve [options] <outdir>
   schedule.py (-h | --help)
   schedule.py --version
 
@@ -14,12 +15,86 @@ Arguments:
 
   outdir         Directory to hold results ("-" for stdout).
   timetable      A csv of an existing timetable.
+  csv            A csv of a timetable to seed the population with as well
+                 (--import may be given more than once).
 
 Options:
 
-  -d,--debug     Turn on debug output.
-  -h,--help      Show this screen.
-  --version      Show version.
+  -d,--debug          Turn on debug output.
+  --evaluator=<name>  Fitness evaluation backend, "python", "numpy",
+                      "delta" or "batch" [default: python].
+  --backend=<name>    How to run the evaluations, "serial", "process" (a
+                      pool of --workers processes), "shared" (a pool
+                      that reads the population from shared memory, needs
+                      the numpy or batch evaluator and Python 3.8) or
+                      "scoop" (start with python -m scoop)
+                      [default: scoop].
+  --workers=<n>       Number of worker processes (solver threads for
+                      solve), defaults to the number of CPUs.
+  --genome=<type>     Genome representation, "list" or "bits" (one bit
+                      per slot) [default: list].
+  --engine=<name>     Search engine, "ga" (the genetic algorithm),
+                      "anneal" (simulated annealing) or "tabu" (tabu
+                      search). anneal and tabu improve the timetable
+                      given, or the greedy one [default: ga].
+  --chains=<n>        Number of annealing chains to run at once, each in
+                      its own process [default: 1].
+  --steps=<n>         Number of annealing moves per chain
+                      [default: 100000].
+  --temperature=<t>   Starting annealing temperature [default: 2].
+  --final-temperature=<t>
+                      Final annealing temperature [default: 0.01].
+  --cooling=<name>    Annealing cooling schedule, "geometric" or "linear"
+                      [default: geometric].
+  --iterations=<n>    Number of tabu search iterations [default: 1000].
+  --tenure=<n>        Number of iterations a moved family activity stays
+                      tabu [default: 10].
+  --full-neighbourhood
+                      Score the moves of every family in each tabu
+                      iteration, not just the families with violations.
+  --greedy            Just write the timetable made by the most
+                      constrained family first greedy scheduler.
+  --seeds=<n>         Number of random greedy timetables to seed the
+                      population with [default: 20].
+  --repair-rate=<fraction>
+                      Fraction of the changed offspring to improve with a
+                      hill climb each generation. Each climb makes at
+                      most the number of moves given by --repair-moves
+                      [default: 0].
+  --repair-moves=<n>  Maximum number of moves in each repair hill climb,
+                      0 to climb until no move improves the timetable
+                      [default: 20].
+  --cache-size=<n>    Number of fitness values to remember, 0 turns the
+                      cache off [default: 100000].
+  --generations=<n>   Maximum number of generations [default: 30000].
+  --target-fitness=<n>
+                      Stop once the best timetable has a fitness (1 +
+                      number of violations) of at most n.
+  --target-goodness=<percent>
+                      Stop once the best timetable meets at least this
+                      percentage of the other activities.
+  --time-limit=<minutes>
+                      Stop after this many minutes.
+  --write-interval=<seconds>
+                      Least time between writes of the best timetable
+                      found by solve, 0 to write each one as it is found
+                      [default: 0].
+  --stagnation=<n>    Stop if the best timetable has not improved for n
+                      generations.
+  --checkpoint-interval=<minutes>
+                      How often to save the state of the run to
+                      checkpoint.pickle in outdir [default: 5].
+  --resume=<checkpoint>
+                      Carry on from a checkpoint.
+  --islands=<n>       Evolve the population as n islands, each in its own
+                      process, 0 for a single population [default: 0].
+  --migration-interval=<k>
+                      Generations between island migrations [default: 25].
+  --migrants=<m>      Number of individuals that migrate [default: 5].
+  --topology=<name>   Island migration topology, "ring" or "random"
+                      [default: ring].
+  -h,--help           Show this screen.
+  --version           Show version.
 
 """
 import logging
@@ -47,6 +122,10 @@ def main():
         check_schedule.run(
             args['<timetable>'],
             Path(args['<outdir>']) if args['<outdir>'] != "-" else None)
+    elif args['solve']:
+        # Only solve needs OR-Tools.
+        from family_camp.schedule import solve_schedule
+        solve_schedule.run(args)
 
 
 if __name__ == "__main__":
@@ -0,0 +1,159 @@
+# coding: utf-8
+"""Simulated annealing engine ("generate --engine anneal").
+
+A single timetable is improved by random family moves (see moves.py),
+each scored incrementally by a DeltaEvaluator. A move that lowers the
+energy is always made, one that raises it by d is made with probability
+exp(-d / T), and the temperature T is lowered from start_temperature to
+end_temperature over the steps:
+
+  geometric - T = start * (end / start) ** (step / steps)
+  linear    - T = start + (end - start) * step / steps
+
+The energy is the number of violations plus the fraction of the other
+activities that are not met (see moves.energy), so a single violation
+outweighs any change in the goodness.
+
+Several chains, each with its own random seed, can be run at once in a
+pool of worker processes. The best timetable found by each chain is added
+to the hall of fame.
+"""
+import math
+import time
+import random
+import logging
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy
+
+from .bitgenome import pack, unpack
+from .checkpoint import unpack_individuals
+from .delta import DeltaEvaluator
+from .moves import FamilyMoves, energy
+
+log = logging.getLogger(__name__)
+
+COOLING = ('geometric', 'linear')
+
+
+class Annealer:
+
+    def __init__(self, campers, sessions, index, weights, steps=100000,
+                 start_temperature=2.0, end_temperature=0.01,
+                 cooling='geometric', time_limit=None):
+        if cooling not in COOLING:
+            raise ValueError("Unknown cooling schedule: {}".format(cooling))
+
+        self.evaluator = DeltaEvaluator(campers, sessions, index)
+        self.moves = FamilyMoves(self.evaluator, index, weights)
+        self.requests = sorted(index.family_activity_campers)
+        self.steps = steps
+        self.start_temperature = start_temperature
+        self.end_temperature = end_temperature
+        self.cooling = cooling
+        self.time_limit = time_limit
+
+    def temperature(self, step):
+        fraction = step / self.steps
+        if self.cooling == 'geometric':
+            return self.start_temperature * (
+                self.end_temperature / self.start_temperature) ** fraction
+        return (self.start_temperature +
+                (self.end_temperature - self.start_temperature) * fraction)
+
+    def random_move(self, genome, rng, tries=1000):
+        """Return the flips of a random family move that changes genome,
+        or None if there are no requests or none of tries random moves
+        changes it (e.g. every family is in the only session it can
+        have)."""
+        if not self.requests:
+            return None
+        for _ in range(tries):
+            group, activity = rng.choice(self.requests)
+            target = rng.choice(self.moves.targets(activity))
+            flips = self.moves.flips(genome, group, activity, target)
+            if len(flips):
+                return flips
+        return None
+
+    def run(self, genome, rng):
+        """Anneal genome (a flat NumPy boolean array, changed in place).
+
+        Returns the best genome found, its (fitness, goodness, bestness)
+        values and the number of moves made."""
+        evaluator = self.evaluator
+        scores = evaluator.full_scores(genome)
+        current = energy(evaluator.values(scores))
+        best, best_genome = current, genome.copy()
+        best_values = evaluator.values(scores)
+
+        started = time.monotonic()
+        accepted = 0
+        for step in range(self.steps):
+            if (self.time_limit is not None and step % 1000 == 0 and
+                    time.monotonic() - started > self.time_limit):
+                break
+
+            flips = self.random_move(genome, rng)
+            if flips is None:
+                log.info("No move changes the timetable, stopping after "
+                         "{} steps.".format(step))
+                break
+            new_scores, _ = self.moves.score(genome, scores, flips)
+            values = evaluator.values(new_scores)
+            e = energy(values)
+
+            if e <= current or rng.random() < math.exp(
+                    (current - e) / self.temperature(step)):
+                scores, current = new_scores, e
+                accepted += 1
+                if e < best:
+                    best, best_genome, best_values = e, genome.copy(), values
+            else:
+                self.moves.undo(genome, flips)
+
+        return best_genome, best_values, accepted
+
+
+def anneal_chain(packed, length, seed, settings):
+    """Run one chain from the packed genome in a worker process.
+
+    Returns the packed best genome, its values and the number of moves
+    made."""
+    from . import generate_schedule
+
+    annealer = Annealer(generate_schedule.campers, generate_schedule.sessions,
+                        generate_schedule.data_cache.index,
+                        generate_schedule.creator.FitnessMin.weights,
+                        **settings)
+    genome, values, accepted = annealer.run(
+        numpy.array(unpack(packed, length), dtype=bool), random.Random(seed))
+    return pack(genome), values, accepted
+
+
+def run_anneal(start, individual_type, halloffame, chains=1, workers=None,
+               **settings):
+    """Anneal chains copies of the start individual and add the best of
+    each to halloffame. settings are passed on to Annealer.
+
+    Returns the best individuals, one per chain."""
+    length = len(start)
+    packed = pack(start)
+    seeds = [random.random() for _ in range(chains)]
+
+    if chains == 1:
+        results = [anneal_chain(packed, length, seeds[0], settings)]
+    else:
+        with ProcessPoolExecutor(max_workers=workers) as executor:
+            results = list(executor.map(
+                anneal_chain, [packed] * chains, [length] * chains, seeds,
+                [settings] * chains))
+
+    for i, (_, values, accepted) in enumerate(results):
+        log.info("Chain {}: {} moves made, fitness {}.".format(
+            i, accepted, values))
+    best = unpack_individuals([_[:2] for _ in results], length,
+                              individual_type)
+
+    halloffame.update(best)
+    return best
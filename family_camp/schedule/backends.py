@@ -0,0 +1,244 @@
+# coding: utf-8
+"""Execution backends for the evaluation of a generation.
+
+A backend provides the map that is registered as toolbox.map:
+
+  serial  - the builtin map, in this process.
+  process - a concurrent.futures.ProcessPoolExecutor. The evaluator is
+            sent to each worker once, when the pool starts, so mapping it
+            only sends the individuals.
+  scoop   - scoop's futures.map. The program has to be started with
+            "python -m scoop".
+  shared  - a process pool that is sent the population through shared
+            memory (see shared.py), which evaluates whole generations.
+            It needs Python 3.8 (multiprocessing.shared_memory).
+
+The process and scoop backends split the individuals into a few chunks
+per worker rather than sending them one at a time. With the batch
+evaluator they also provide evaluate_population, which scores each chunk
+with the evaluator's evaluate_population in a worker.
+
+register_evaluator picks the fitness evaluator and setup_backend puts
+it together with an execution backend in the toolbox.
+"""
+import math
+import os
+import sys
+import logging
+from functools import partial
+from concurrent.futures import ProcessPoolExecutor
+
+from .deep import evaluate
+from .numpy_fitness import NumpyEvaluator
+from .delta import DeltaEvaluator
+
+log = logging.getLogger(__name__)
+
+# The evaluator installed in a process backend worker by _init_worker.
+_evaluator = None
+
+
+def chunked(items, num_chunks):
+    """Split items into at most num_chunks lists of (nearly) equal size."""
+    size = max(1, math.ceil(len(items) / max(1, num_chunks)))
+    return [items[i:i + size] for i in range(0, len(items), size)]
+
+
+def unwrap(func):
+    """Return the function that toolbox.register wrapped in a partial
+    without any arguments of its own, or func if there is none."""
+    if isinstance(func, partial) and not func.args and not func.keywords:
+        return func.func
+    return func
+
+
+def _map_chunk(func, chunk):
+    return [func(_) for _ in chunk]
+
+
+def _init_worker(evaluator):
+    global _evaluator
+    _evaluator = evaluator
+
+
+def _evaluate_chunk(chunk):
+    return [_evaluator(_) for _ in chunk]
+
+
+def _evaluate_population_chunk(chunk):
+    return _evaluator.evaluate_population(chunk)
+
+
+def _map_population(evaluator, chunk):
+    return evaluator.evaluate_population(chunk)
+
+
+def import_scoop_futures():
+    """Import scoop.futures, working around scoop still using the
+    collections aliases that were removed in Python 3.10."""
+    try:
+        from scoop import futures
+    except ImportError:
+        import collections.abc
+        # hyper needs the four following aliases to be done manually.
+        collections.Iterable = collections.abc.Iterable
+        collections.Mapping = collections.abc.Mapping
+        collections.MutableSet = collections.abc.MutableSet
+        collections.MutableMapping = collections.abc.MutableMapping
+        from scoop import futures
+    return futures
+
+
+class SerialBackend:
+
+    name = 'serial'
+
+    def map(self, func, iterable):
+        return list(map(func, iterable))
+
+    def close(self):
+        pass
+
+
+class ProcessBackend:
+    """Evaluate in a pool of worker processes.
+
+    evaluator is installed in each worker when it starts, map(evaluator,
+    individuals) then only has to send the individuals. Any other
+    function is sent along with each chunk."""
+
+    name = 'process'
+
+    def __init__(self, evaluator, workers=None, chunks_per_worker=4):
+        self.evaluator = evaluator
+        self.workers = workers or os.cpu_count()
+        self.chunks_per_worker = chunks_per_worker
+        self.executor = ProcessPoolExecutor(
+            max_workers=self.workers, initializer=_init_worker,
+            initargs=(evaluator,))
+
+    def map(self, func, iterable):
+        items = list(iterable)
+        chunks = chunked(items, self.workers * self.chunks_per_worker)
+        if unwrap(func) is self.evaluator:
+            results = self.executor.map(_evaluate_chunk, chunks)
+        else:
+            results = self.executor.map(_map_chunk, [func] * len(chunks),
+                                        chunks)
+        return [value for chunk in results for value in chunk]
+
+    def evaluate_population(self, individuals):
+        """Score individuals with evaluator.evaluate_population, a chunk
+        at a time in the workers."""
+        chunks = chunked(list(individuals),
+                         self.workers * self.chunks_per_worker)
+        results = self.executor.map(_evaluate_population_chunk, chunks)
+        return [values for chunk in results for values in chunk]
+
+    def close(self):
+        self.executor.shutdown()
+
+
+class ScoopBackend:
+
+    name = 'scoop'
+
+    def __init__(self, evaluator, workers=None, chunks_per_worker=4):
+        self.futures = import_scoop_futures()
+        self.evaluator = evaluator
+        self.workers = workers or os.cpu_count()
+        self.chunks_per_worker = chunks_per_worker
+
+    def map(self, func, iterable):
+        items = list(iterable)
+        chunks = chunked(items, self.workers * self.chunks_per_worker)
+        results = self.futures.map(_map_chunk, [func] * len(chunks), chunks)
+        return [value for chunk in results for value in chunk]
+
+    def evaluate_population(self, individuals):
+        """Score individuals with evaluator.evaluate_population, a chunk
+        at a time in the workers."""
+        chunks = chunked(list(individuals),
+                         self.workers * self.chunks_per_worker)
+        results = self.futures.map(_map_population,
+                                   [self.evaluator] * len(chunks), chunks)
+        return [values for chunk in results for values in chunk]
+
+    def close(self):
+        pass
+
+
+def register_evaluator(name, toolbox_, campers, sessions):
+    """Register the named fitness evaluation backend as toolbox.evaluate.
+
+    The "batch" backend also registers toolbox.evaluate_population, which
+    ea_simple uses to score each generation in one go.
+
+    Returns the evaluator itself, rather than the partial that
+    toolbox.register puts around it, to be given to setup_backend."""
+    if hasattr(toolbox_, "evaluate_population"):
+        toolbox_.unregister("evaluate_population")
+
+    if name == 'python':
+        toolbox_.register("evaluate", partial(evaluate, campers=campers,
+                                             sessions=sessions))
+    elif name == 'numpy':
+        toolbox_.register("evaluate", NumpyEvaluator(campers, sessions))
+    elif name == 'delta':
+        # The delta evaluator keeps its state on the individuals, so it
+        # has to run in this process.
+        toolbox_.register("evaluate", DeltaEvaluator(campers, sessions))
+        toolbox_.register("map", map)
+    elif name == 'batch':
+        evaluator = NumpyEvaluator(campers, sessions)
+        toolbox_.register("evaluate", evaluator)
+        toolbox_.register("evaluate_population",
+                          evaluator.evaluate_population)
+    else:
+        raise ValueError("Unknown evaluator: {}".format(name))
+
+    return unwrap(toolbox_.evaluate)
+
+
+def make_backend(name, evaluator, workers=None):
+    """Return the named backend, ready to map evaluator."""
+    if name == 'serial':
+        return SerialBackend()
+    elif name == 'process':
+        return ProcessBackend(evaluator, workers)
+    elif name == 'scoop':
+        return ScoopBackend(evaluator, workers)
+    elif name == 'shared':
+        if sys.version_info < (3, 8):
+            raise ValueError("The shared backend needs Python 3.8 or later "
+                             "(multiprocessing.shared_memory)")
+        from .shared import SharedMemoryBackend
+        return SharedMemoryBackend(evaluator, workers)
+    raise ValueError("Unknown backend: {}".format(name))
+
+
+def setup_backend(name, toolbox_, evaluator, workers=None):
+    """Make the named backend for evaluator (as returned by
+    register_evaluator) and register its map in toolbox_.
+
+    The shared backend's evaluate_population is registered too, and so is
+    that of the process and scoop backends if the evaluator is the batch
+    one, in place of the batch evaluator's own, which would score the
+    whole generation in this process.
+
+    The delta evaluator has to run in this process, so it always gets the
+    serial backend.
+
+    Returns the backend, which has to be closed when the run is over."""
+    if isinstance(evaluator, DeltaEvaluator) and name != 'serial':
+        log.warning('The delta evaluator has to run in this process, '
+                    'using the serial backend.')
+        name = 'serial'
+
+    backend = make_backend(name, evaluator, workers)
+    toolbox_.register("map", backend.map)
+    if hasattr(backend, "evaluate_population") and (
+            backend.name == 'shared' or
+            hasattr(toolbox_, "evaluate_population")):
+        toolbox_.register("evaluate_population", backend.evaluate_population)
+    return backend
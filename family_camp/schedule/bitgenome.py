@@ -0,0 +1,117 @@
+# coding: utf-8
+"""A bit packed alternative to the list of True/False genome.
+
+A list uses a pointer (8 bytes) for each (session, camper) slot. BitGenome
+stores one bit per slot in a bytearray, which makes an individual ~64
+times smaller and much cheaper to clone and to pickle to the workers.
+
+It supports the parts of the list interface that the rest of the code
+uses (indexing, slicing, len, iteration, count and equality), so it can
+be used as the base class for creator.Individual unchanged.
+"""
+import sys
+
+import numpy
+
+
+class BitGenome:
+    """A fixed length sequence of booleans stored one bit per element."""
+
+    def __init__(self, values=()):
+        if isinstance(values, BitGenome):
+            self._bits = bytearray(values._bits)
+            self._len = values._len
+        else:
+            if not isinstance(values, numpy.ndarray):
+                values = numpy.fromiter(values, dtype=bool)
+            values = numpy.asarray(values, dtype=bool).ravel()
+            self._len = len(values)
+            self._bits = bytearray(
+                numpy.packbits(values, bitorder='little').tobytes())
+
+    def packed(self):
+        """Return a (writable) uint8 NumPy view of the packed bits."""
+        return numpy.frombuffer(self._bits, dtype=numpy.uint8)
+
+    def as_array(self):
+        """Return the genome as a NumPy array of booleans."""
+        return numpy.unpackbits(self.packed(), count=self._len,
+                                bitorder='little').view(bool)
+
+    def tobytes(self):
+        return bytes(self._bits)
+
+    def _index(self, index):
+        if index < 0:
+            index += self._len
+        if not 0 <= index < self._len:
+            raise IndexError("BitGenome index out of range")
+        return index
+
+    def __len__(self):
+        return self._len
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            return self.as_array()[index].tolist()
+        index = self._index(index)
+        return bool(self._bits[index >> 3] & (1 << (index & 7)))
+
+    def __setitem__(self, index, value):
+        if isinstance(index, slice):
+            values = self.as_array()
+            values[index] = value
+            self._bits[:] = numpy.packbits(values,
+                                           bitorder='little').tobytes()
+            return
+        index = self._index(index)
+        if value:
+            self._bits[index >> 3] |= 1 << (index & 7)
+        else:
+            self._bits[index >> 3] &= ~(1 << (index & 7)) & 0xff
+
+    def __iter__(self):
+        return iter(self.as_array().tolist())
+
+    def count(self, value):
+        ones = int(numpy.unpackbits(self.packed()).sum())
+        return ones if value else self._len - ones
+
+    def __eq__(self, other):
+        if isinstance(other, BitGenome):
+            return self._len == other._len and self._bits == other._bits
+        try:
+            return len(self) == len(other) and list(self) == list(other)
+        except TypeError:
+            return NotImplemented
+
+    def __ne__(self, other):
+        result = self.__eq__(other)
+        return result if result is NotImplemented else not result
+
+    __hash__ = None
+
+    def __str__(self):
+        return "".join("1" if _ else "0" for _ in self)
+
+    def __repr__(self):
+        return "{}({})".format(self.__class__.__name__, str(self))
+
+    def __sizeof__(self):
+        return object.__sizeof__(self) + sys.getsizeof(self._bits)
+
+
+def pack(individual):
+    """Return the genome of individual (a BitGenome or a list of bools)
+    packed one bit per slot."""
+    if isinstance(individual, BitGenome):
+        return individual.tobytes()
+    return numpy.packbits(
+        numpy.fromiter(individual, dtype=bool, count=len(individual)),
+        bitorder='little').tobytes()
+
+
+def unpack(packed, length):
+    """Return the NumPy array of booleans for a genome packed by pack()."""
+    return numpy.unpackbits(numpy.frombuffer(packed, dtype=numpy.uint8),
+                            count=length, bitorder='little').view(bool)
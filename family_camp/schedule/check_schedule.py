@@ -38,10 +38,11 @@ def run(timetable, out_dir: Union[Path, None]):
     with open(timetable) as timetable:
         individual = individual_from_list(
             list(csv.reader(timetable, delimiter=',')),
-            campers, acts, sessions)
+            campers, acts, sessions, index=data_cache.index)
 
+    ind = Individual(individual, campers, sessions)
     status_out, inactive_out, campers_out, activites_out, inactive_adult_campers_out = print_individual(
-        Individual(individual, campers, sessions), campers)
+        ind, campers)
 
     if out_dir is None:
         for section in [status_out, campers_out, activites_out, inactive_out]:
@@ -55,4 +56,6 @@ def run(timetable, out_dir: Union[Path, None]):
         out_dir.joinpath("inactive_campers.txt").write_text(inactive_adult_campers_out)
         out_dir.joinpath("campers.txt").write_text(campers_out)
         out_dir.joinpath("activites.txt").write_text(activites_out)
+        out_dir.joinpath("violations.json").write_text(ind.violations().to_json())
+        out_dir.joinpath("violations.csv").write_text(ind.violations().to_csv())
 
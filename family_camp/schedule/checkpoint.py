@@ -0,0 +1,123 @@
+# coding: utf-8
+"""Checkpointing of the state of a generate run.
+
+A checkpoint holds everything needed to carry on evolving from where the
+run was: the population and the hall of fame (as packed genomes and their
+fitness values), the logbook, the generation number and the states of
+the random and NumPy random number generators.
+
+Checkpoints are written to a temporary file in the same directory and
+then renamed over the old one, so a crash part way through a write never
+leaves a broken checkpoint behind.
+"""
+import os
+import pickle
+import random
+import tempfile
+import time
+import logging
+
+import numpy
+
+from .bitgenome import pack, unpack
+
+log = logging.getLogger(__name__)
+
+VERSION = 1
+
+
+def pack_individuals(individuals):
+    """Return (packed genome, fitness values) pairs for individuals."""
+    return [(pack(ind), ind.fitness.values) for ind in individuals]
+
+
+def unpack_individuals(packed, length, individual_type):
+    """Rebuild the individuals from pack_individuals as individual_type
+    (e.g. creator.Individual or creator.PackedIndividual)."""
+    individuals = []
+    for genome, values in packed:
+        bits = unpack(genome, length)
+        if issubclass(individual_type, list):
+            bits = bits.tolist()
+        ind = individual_type(bits)
+        if values:
+            ind.fitness.values = values
+        individuals.append(ind)
+    return individuals
+
+
+def save_checkpoint(path, generation, population, halloffame, logbook):
+    """Atomically write a checkpoint to path."""
+    state = {
+        'version': VERSION,
+        'generation': generation,
+        'length': len(population[0]),
+        'population': pack_individuals(population),
+        'halloffame': pack_individuals(halloffame)
+                      if halloffame is not None else [],
+        'logbook': logbook,
+        'random': random.getstate(),
+        'numpy_random': numpy.random.get_state(),
+    }
+
+    directory = os.path.dirname(os.path.abspath(path))
+    fd, tmp = tempfile.mkstemp(dir=directory, prefix='.checkpoint-')
+    try:
+        with os.fdopen(fd, 'wb') as f:
+            pickle.dump(state, f, protocol=pickle.HIGHEST_PROTOCOL)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp, path)
+    except BaseException:
+        os.unlink(tmp)
+        raise
+
+
+def load_checkpoint(path, individual_type, halloffame=None):
+    """Read the checkpoint at path and restore the random number
+    generators.
+
+    The hall of fame entries are inserted into halloffame, if it is given.
+    Returns (generation, population, logbook)."""
+    with open(path, 'rb') as f:
+        state = pickle.load(f)
+
+    if state.get('version') != VERSION:
+        raise ValueError("Unsupported checkpoint version in {}: {}".format(
+            path, state.get('version')))
+
+    length = state['length']
+    population = unpack_individuals(state['population'], length,
+                                    individual_type)
+    if halloffame is not None:
+        for ind in unpack_individuals(state['halloffame'], length,
+                                      individual_type):
+            halloffame.insert(ind)
+
+    random.setstate(state['random'])
+    numpy.random.set_state(state['numpy_random'])
+
+    return state['generation'], population, state['logbook']
+
+
+class Checkpointer:
+    """Save a checkpoint to path at most once every interval seconds.
+
+    Passed to ea_simple, which calls it at the end of each generation and
+    with force=True when the run finishes."""
+
+    def __init__(self, path, interval=600):
+        self.path = path
+        self.interval = interval
+        self.last = time.monotonic()
+
+    def __call__(self, generation, population, halloffame, logbook,
+                 force=False):
+        now = time.monotonic()
+        if not force and now - self.last < self.interval:
+            return
+        save_checkpoint(self.path, generation, population, halloffame,
+                        logbook)
+        log.info("Checkpoint for generation {} written to {} in {:.2f}s".format(
+            generation, self.path, time.monotonic() - now))
+        self.last = time.monotonic()
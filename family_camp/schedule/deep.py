@@ -7,8 +7,8 @@ from copy import deepcopy
 from datetime import timedelta, datetime
 import logging
 import pickle
-from dataclasses import dataclass
-#import numpy
+
+import numpy
 
 try:
     from . import google
@@ -22,6 +22,10 @@ from statistics import pvariance
 
 from deap.tools import HallOfFame
 
+from .problem import ProblemIndex
+from .bitgenome import BitGenome
+from .report import ViolationReport
+
 log = logging.getLogger(__name__)
 
 DATEFORMAT = "%a %H:%M"
@@ -92,10 +96,25 @@ class Session:
 
 
 class SessionInst:
+    """The campers allocated to a session.
 
-    def __init__(self, session, all_campers, campers):
+    As well as the list of campers, membership is held as two integer
+    bitsets: camper_bits has bit i set if the i'th camper (in the order of
+    all_campers) is in the session and group_bits has bit i set if a
+    member of the i'th family (see ProblemIndex.group_id) is. The campers
+    (or families) that two sessions have in common are then a single
+    bitwise AND."""
+
+    def __init__(self, session, all_campers, campers, index=None):
         self.session = session
         self.all_campers = all_campers
+        if index is not None:
+            self.camper_id = index.camper_id
+            self.group_id = index.group_id
+        else:
+            self.camper_id = {c: i for i, c in enumerate(all_campers)}
+            self.group_id = {g: i for i, g in enumerate(
+                sorted(set(c.group for c in all_campers)))}
         self.family_groups = None
         self.set_campers(campers)
 
@@ -103,21 +122,32 @@ class SessionInst:
         return len(self.campers)
 
     def update_family_groups(self):
-        self.family_groups = set([c.group for c in self.campers])
+        self.family_groups = frozenset(c.group for c in self.campers)
+        self.group_bits = 0
+        for g in self.family_groups:
+            self.group_bits |= 1 << self.group_id[g]
 
     def add_camper(self, camper):
         self.campers.append(camper)
-        self.update_family_groups()
+        self.camper_bits |= 1 << self.camper_id[camper]
+        if camper.group not in self.family_groups:
+            self.family_groups = self.family_groups | {camper.group}
+            self.group_bits |= 1 << self.group_id[camper.group]
 
     def set_campers(self, campers):
         self.campers = list(it.compress(self.all_campers,
                                         campers))
+        self.camper_bits = int.from_bytes(
+            numpy.packbits(numpy.fromiter(campers, dtype=bool,
+                                          count=len(self.all_campers)),
+                           bitorder='little').tobytes(), 'little')
         self.update_family_groups()
 
-        # self.campers = []
-        # for i in range(0, len(campers)):
-        #     if campers[i]:
-        #         self.campers.append(self.all_campers[i])
+    def has_camper(self, camper):
+        return bool(self.camper_bits >> self.camper_id[camper] & 1)
+
+    def has_group(self, group):
+        return group in self.family_groups
 
     def __str__(self):
         return "Session: {} ({}) {} / Campers: {}".format(
@@ -138,32 +168,56 @@ def get_overlapping_sessions(session, sessions):
                     _, session))]
 
 
+def check_overlaps(index):
+    """Check that the overlap map in index matches the pairwise
+    definition in sessions_overlap. Raises AssertionError if it does not."""
+    sessions = index.sessions
+    for i, session in enumerate(sessions):
+        expected = [sessions.index(_)
+                    for _ in get_overlapping_sessions(session, sessions)]
+        assert index.overlaps[i] == expected, \
+            "Overlap map is wrong for {}: {} != {}".format(
+                session, index.overlaps[i], expected)
+
+
 class Individual:
     # There is a basic assumption that the sessions and campers lists never change.
     # So we can cache the results of some operations for performance.
 
-    __overlapping_sessions_map__ = None
-
-    def __init__(self, timetable, campers, sessions, session_insts=None, summary_file=sys.stderr):
+    # The ProblemIndex (including the session overlap map) for the last
+    # campers and sessions seen, so that it is not rebuilt for every
+    # individual.
+    __problem_index__ = None
+
+    @classmethod
+    def problem_index(cls, campers, sessions):
+        index = cls.__problem_index__
+        if (index is None or index.campers is not campers
+                or index.sessions is not sessions):
+            index = cls.__problem_index__ = ProblemIndex(campers, sessions)
+        return index
+
+    def __init__(self, timetable, campers, sessions, session_insts=None, summary_file=sys.stderr,
+                 index=None):
         self.campers = campers
         self.sessions = sessions
         self.summary_file = summary_file
+        self._report = None
+        self.index = index if index is not None else self.problem_index(campers, sessions)
         if session_insts:
             self.session_inst = session_insts
         else:
             self.session_inst = [
                 SessionInst(session,
                             campers,
-                            timetable[session_idx:session_idx + len(campers)])
+                            timetable[session_idx:session_idx + len(campers)],
+                            index=self.index)
                 for session, session_idx in
                 zip(sessions,
                     range(0, len(campers) * len(sessions), len(campers)))
             ]
 
-        self.overlapping_sessions_map = self.__class__.__overlapping_sessions_map__ = \
-            {session: get_overlapping_sessions(session,
-                                               self.sessions)
-             for session in self.sessions}
+        self.overlapping_sessions_map = self.index.overlapping_sessions
 
         # Create a lookup map from session to its matching instance.
         self.session_inst_map = \
@@ -213,13 +267,21 @@ class Individual:
         camper => [sessions_inst]
         """
 
-        campers = {}
+        campers = {c: [] for c in self.campers}
 
-        for c in self.campers:
-            campers[c] = [s for s in self.session_inst if c in s.campers]
+        # Walk the sessions rather than testing each camper against every
+        # session, the lists still end up in session order.
+        for s in self.session_inst:
+            for c in s.campers:
+                campers[c].append(s)
 
         return campers
 
+    def camper_activities(self):
+        """Return a dictionary of camper => [activity] in session order."""
+        return {c: [s.session.activity for s in insts]
+                for c, insts in self.export_by_camper().items()}
+
     def export_by_family(self):
         """Return a dictionary of the following form:
 
@@ -229,8 +291,7 @@ class Individual:
         ret = {}
         for f in set(c.group for c in self.campers):
             ret[f] = {}
-            for s in sorted([s for s in self.session_inst if f in
-                                                             [camper.group for camper in s.campers]],
+            for s in sorted([s for s in self.session_inst if s.has_group(f)],
                             key=lambda s: s.session.start):
                 ret[f][s] = [c for c in s.campers if c.group == f]
 
@@ -266,101 +327,60 @@ class Individual:
 
         # @profile
 
-    def fitness(self, debug=False):
+    def fitness(self):
         """Measure the number of violations of the validity criteria.
         The higher the number the worse it is.
         A value of 1 means no violations.
+
+        Use violations() to find out what the violations are.
         """
         count = 1
 
         for s in self.session_inst:
+            others = [self.session_inst_map[other_s]
+                      for other_s in self.overlapping_sessions_map[s.session]]
+
             # Count the number of times we have the same camper in two sessions
             # that overlap.
-            count += len([other_s for c in s.campers
-                          for other_s in self.overlapping_sessions_map[s.session]
-                          if c in self.session_inst_map[other_s].campers])
+            count += sum(bin(s.camper_bits & other.camper_bits).count("1")
+                         for other in others)
 
             # Count the number of times we have a family split accross two
             # sessions that overlap
-            split_families = [g for g in s.family_groups
-                              for other_s in self.overlapping_sessions_map[s.session]
-                              if g in self.session_inst_map[other_s].family_groups]
-            count += len(split_families)
-
-            if debug:
-                if len(split_families):
-                    self.summary_file.write(
-                        "\n\n== Families split across two sessions ==\n")
-                for g in split_families:
-                    self.summary_file.write(
-                        "{} Found in other session: {}\n".format(
-                            str(g), str(s)))
+            count += sum(bin(s.group_bits & other.group_bits).count("1")
+                         for other in others)
 
             # How badly have we exceeded session limits?
             if len(s.campers) - s.session.activity.limit > 0:
-                if debug:
-                    self.summary_file.write(
-                        "\n\n== Sessions exceeding size limit. ==\n")
-
-                    self.summary_file.write("{} Exceeded limit: {} > {}\n".format(
-                        str(s), len(s.campers), s.session.activity.limit))
                 count += len(s.campers) - s.session.activity.limit
 
             # How badly are we below the minimum session size?
             if len(s.campers) < s.session.activity.min:
-                if debug:
-                    self.summary_file.write(
-                        "\n\n== Sessions under session min. ==\n")
-
-                    self.summary_file.write("{} Below min: {} > {}\n".format(
-                        str(s), len(s.campers), s.session.activity.min))
                 count += s.session.activity.min - len(s.campers)
 
         # How many campers are missing their priorities?
-        for c in self.campers:
-            activities = [s.session.activity
-                          for s in self.session_inst
-                          if c in s.campers]
+        for c, activities in self.camper_activities().items():
 
             # How many campers are missing their priorities?
-            missing = set(c.priorities) - set(activities)
-            if len(missing):
-                if debug:
-                    self.summary_file.write("{} missing {}\n".format(
-                        str(c), " ".join([str(_) for _ in missing])))
-            count += len(missing)
+            count += len(set(c.priorities) - set(activities))
 
             # How many campers are doing activities they did not request?
-            unwanted = set(activities) - (set(c.priorities) | set(c.others))
-            if len(unwanted):
-                if debug:
-                    self.summary_file.write("{} unwanted {}\n".format(
-                        str(c), " ".join([str(_) for _ in unwanted])))
-            count += len(unwanted)
+            count += len(set(activities) - (set(c.priorities) | set(c.others)))
 
             # How many times are campers doing the same activity more than
             # once?
-            duplicates = len(activities) - len(set(activities))
-            if duplicates:
-                if debug:
-                    self.summary_file.write("{} duplicated {}\n".format(str(c), duplicates))
-            count += duplicates
+            count += len(activities) - len(set(activities))
 
         return count
 
-    def goodness(self, campers, debug=False):
+    def goodness(self, campers):
         """Measure how many of the other activities we have met.
 
         The higher the value the better."""
 
         # What percentage of the other activities have been met?
-
-        # Total number of other activities requested.
-        other_total = sum([len(c.others) for c in self.campers])
         met = 0
-        for c in self.campers:
-            activities = [s.session.activity for s in self.session_inst
-                          if c in s.campers]
+        for c, activities in self.camper_activities().items():
             # The intersection is the list of activities that have been met.
             # we divide this by the number that have been asked for. This
             # give 1 if they have all been met and 0 if none have been met.
@@ -369,29 +389,24 @@ class Individual:
             # goodness. This should favour those that have only request a
             # small number of activites.
             num_others = len(c.others)
-            set_others = set(c.others)
-            set_acts = set(activities)
 
             met += (1 if num_others == 0 else
-                    len(set_others & set_acts) / num_others)
-
-            if (len(set_others) > len(set_others & set_acts)):
-                if debug:
-                    self.summary_file.write("Others not met: {} missing - {}\n".format(
-                        str(c), " ".join(str(_) for _ in
-                                         set_others - set_acts)))
+                    len(set(c.others) & set(activities)) / num_others)
 
         # If all campers have all activitites met == len(campers)
         # so met / len(campers) is the fraction of activities not met
         # wieghted by the greediness of each camper.
         percentage_met = ((met / len(campers)) * 100)
 
-        if debug and percentage_met != 100:
-            self.summary_file.write("Percentation met: {} {} {}\n".format(
-                percentage_met, other_total, met))
-
         return percentage_met if percentage_met != 0 else 1
 
+    def violations(self):
+        """Return a ViolationReport listing what is wrong with the
+        timetable."""
+        if self._report is None:
+            self._report = ViolationReport(self)
+        return self._report
+
     def bestness(self):
         """Return a composite measure of how 'good' the individual is.
 
@@ -409,91 +424,78 @@ class Individual:
         return "{}".format("\n".join([str(_) for _ in self.session_inst]))
 
 
-def timetable_from_list(schedule, campers, activities, sessions):
+def parse_start(start_datetime):
+    """Parse a session start time as written in a timetable csv file."""
+    try:
+        return datetime.strptime(start_datetime, "%Y-%m-%d %H:%M:%S")
+    except ValueError:
+        # Almost certainly the wrong date format, try again.
+        return datetime.strptime(start_datetime, "%d/%m/%Y %H:%M:%S")
+
+
+def _lookup_slot(index, group, camper, activity, start_datetime):
+    """Return the (session, camper) for a row of a timetable csv file."""
+    c = index.find_camper(group, camper)
+    if c is None:
+        log.error("Unknown camper: '{}/{}'".format(group, camper))
+        log.error("All campers {}".format("\n".join(["'{}/{}'".format(_.group, _.name) for _ in index.campers
+                                                     if _.group == group])))
+        raise KeyError("Unknown camper: '{}/{}'".format(group, camper))
+
+    start = parse_start(start_datetime)
+    log.debug("Looking for session: {}/{} '{}' - '{}'".format(
+        group, camper, activity.strip(), start))
+
+    s = index.find_session(activity, start)
+    if s is None:
+        log.error("Unknown session: {}/{} '{}' - '{}'".format(
+            group, camper, activity.strip(), start))
+        log.error("All sessions: {}".format(
+            "\n".join(["'{}' - '{}'".format(_.label, _.start) for _ in index.sessions])))
+        raise KeyError("Unknown session: '{}' - '{}'".format(
+            activity.strip(), start))
+
+    return s, c
+
+
+def timetable_from_list(schedule, campers, activities, sessions, index=None):
     """Generate a Timetable object from a list of the form:
 
        (group, camper, activity, start datetime)
 
      Timetable object."""
 
+    if index is None:
+        index = ProblemIndex(campers, sessions)
+
     # map of all possible session instances, initialised with no campers.
     session_insts = {s: SessionInst(s, campers, [False, ] * len(campers))
                      for s in sessions}
 
     for (group, camper, activity, start_datetime) in schedule:
-        c = [_ for _ in campers if _.group.strip() == group.strip() and
-             _.name.strip() == camper.strip()][0]
-
-        try:
-            s = [_ for _ in sessions if _.label == activity and
-                 _.start == datetime.strptime(start_datetime,
-                                              "%Y-%m-%d %H:%M:%S")][0]
-        except ValueError:
-            # Almost certainly the wrong date format, try again.
-
-            s = [_ for _ in sessions if _.label == activity and
-                 _.start == datetime.strptime(start_datetime,
-                                              "%d/%m/%Y %H:%M:%S")][0]
-
+        s, c = _lookup_slot(index, group, camper, activity, start_datetime)
         session_insts[s].add_camper(c)
 
-    return Individual(None, campers, sessions, session_insts.values())
+    return Individual(None, campers, sessions, session_insts.values(),
+                      index=index)
 
 
-def individual_from_list(schedule, campers, activities, sessions):
+def individual_from_list(schedule, campers, activities, sessions, index=None):
     """Generate an individual from a list of the form:
 
        (group, camper, activity, start datetime)
 
     """
 
+    if index is None:
+        index = ProblemIndex(campers, sessions)
+
     # create an empty individual
     ind = [False, ] * len(sessions) * len(campers)
 
     for (group, camper, activity, start_datetime) in schedule:
-        c = [_ for _ in campers if _.group.strip() == group.strip() and _.name.strip() == camper.strip()]
-        if not c:
-            log.error("Unknown camper: '{}/{}'".format(group, camper))
-            log.error("All campers {}".format("\n".join(["'{}/{}'".format(_.group, _.name) for _ in campers
-                                                         if _.group == group])))
-
-        c = c[0]
-        log.debug("Looking for session: {}/{} '{}' - '{}'".format(
-            group, camper,
-            activity.strip(),
-            datetime.strptime(start_datetime,
-                              "%Y-%m-%d %H:%M:%S")))
-        try:
-            s = [_ for _ in sessions if _.label == activity and
-                 _.start == datetime.strptime(start_datetime,
-
-                                              "%Y-%m-%d %H:%M:%S")]
-            if not s:
-                log.error("Unknown session: {}/{} '{}' - '{}'".format(
-                    group, camper,
-                    activity.strip(),
-                    datetime.strptime(start_datetime,
-                                      "%Y-%m-%d %H:%M:%S")))
-                log.error("All sessions: {}".format(
-                    "\n".join(["'{}' - '{}'".format(_.label, _.start) for _ in sessions])))
-
-        except ValueError:
-            # Almost certainly the wrong date format, try again.
-            s = [_ for _ in sessions if _.label.strip() == activity.strip() and
-                 _.start == datetime.strptime(start_datetime,
-                                              "%d/%m/%Y %H:%M:%S")]
-            if not s:
-                log.error("Unknown session: {}/{} '{}' - '{}'".format(
-                    group, camper,
-                    activity.strip(),
-                    datetime.strptime(start_datetime,
-                                      "%d/%m/%Y %H:%M:%S")))
-                log.error("All sessions: {}".format(
-                    "\n".join(["'{}' - '{}'".format(_.label, _.start) for _ in sessions])))
-
-        s = s[0]
-
-        ind[(sessions.index(s) * len(campers)) + campers.index(c)] = True
+        s, c = _lookup_slot(index, group, camper, activity, start_datetime)
+        ind[index.slot(s, c)] = True
 
     return ind
 
@@ -576,6 +578,9 @@ class MyHallOfFame(HallOfFame):
                 with open(os.path.join(self.dest, filename + ".csv"), 'w') as f:
                     f.write(timetable.export_cvs())
 
+                with open(os.path.join(self.dest, filename + "_violations.csv"), 'w') as f:
+                    f.write(timetable.violations().to_csv())
+
 
 def get_source_data():
     """Return the activities, sessions and campers."""
@@ -651,20 +656,113 @@ def get_source_data():
             for group in all_groups
         } for act in data_cache.activities}
 
-    data_cache.overlapping_sessions = {
-        session: get_overlapping_sessions(session, sessions) for session in sessions
-    }
+    data_cache.index = ProblemIndex(campers, sessions)
+    data_cache.overlapping_sessions = data_cache.index.overlapping_sessions
+
+    if log.isEnabledFor(logging.DEBUG):
+        check_overlaps(data_cache.index)
+
+    # Individuals built from these campers and sessions share the index.
+    Individual.__problem_index__ = data_cache.index
 
     return acts, sessions, campers, data_cache
 
 
 def evaluate(individual, campers, sessions, debug=False):
-    # Do some hard computing on the individual
-    ind = Individual(individual, campers, sessions)
-    fitness = 1. / ind.fitness(debug=debug)
-    goodness = 1. / ind.goodness(campers, debug=debug)
-    bestness = (1. / ind.bestness()) if ind.bestness() != 0 else 0
-    # print("fitness = {}, goodness = {}".format(fitness, goodness))
+    if debug:
+        # Go the long way round, through the Individual methods, and
+        # write out the violations.
+        ind = Individual(individual, campers, sessions)
+        ind.summary_file.write(ind.violations().summary())
+        fitness = 1. / ind.fitness()
+        goodness = 1. / ind.goodness(campers)
+        bestness = (1. / ind.bestness()) if ind.bestness() != 0 else 0
+        return fitness, goodness, bestness
+
+    return fused_evaluate(individual,
+                          Individual.problem_index(campers, sessions))
+
+
+def pvariance_int(values):
+    """statistics.pvariance for a list of integers.
+
+    Worked out from exact integer sums and a single division, which
+    rounds to the same float as pvariance but is much quicker."""
+    n = len(values)
+    total = sum(values)
+    squares = sum(_ * _ for _ in values)
+    return (n * squares - total * total) / (n * n)
+
+
+def fused_evaluate(individual, index):
+    """Return the (fitness, goodness, bestness) tuple for individual.
+
+    This gives the same values as Individual.fitness(), goodness() and
+    bestness() but walks the genome once, building the campers in each
+    session and the activities of each camper as it goes, rather than
+    creating SessionInst objects and rescanning them for each measure."""
+    num_campers = index.num_campers
+    camper_group = index.camper_group
+    session_activity = index.session_activity
+
+    # Slicing a list is cheap, slicing anything else (e.g. a BitGenome)
+    # may not be.
+    genome = individual if isinstance(individual, list) else list(individual)
+
+    session_campers = []
+    session_groups = []
+    camper_activities = [[] for _ in range(num_campers)]
+
+    for session_idx, offset in enumerate(index.session_offset):
+        members = list(it.compress(range(num_campers),
+                                   genome[offset:offset + num_campers]))
+        session_campers.append(set(members))
+        session_groups.append(set(camper_group[c] for c in members))
+
+        act = session_activity[session_idx]
+        for c in members:
+            camper_activities[c].append(act)
+
+    count = 1
+    for session_idx, session in enumerate(index.sessions):
+        members = session_campers[session_idx]
+        groups = session_groups[session_idx]
+
+        # Campers and families in two overlapping sessions. Each pair of
+        # sessions is counted from both sides, as in Individual.fitness.
+        for other in index.overlaps[session_idx]:
+            count += len(members & session_campers[other])
+            count += len(groups & session_groups[other])
+
+        # Session limit and minimum.
+        if len(members) > session.activity.limit:
+            count += len(members) - session.activity.limit
+        if len(members) < session.activity.min:
+            count += session.activity.min - len(members)
+
+    met = 0
+    for c in range(num_campers):
+        activities = camper_activities[c]
+        set_acts = set(activities)
+
+        # Missing priorities, unwanted activities and duplicates.
+        count += len(index.camper_priorities[c] - set_acts)
+        count += len(set_acts - index.camper_wanted[c])
+        count += len(activities) - len(set_acts)
+
+        num_others = index.camper_num_others[c]
+        met += (1 if num_others == 0 else
+                len(index.camper_others[c] & set_acts) / num_others)
+
+    percentage_met = (met / num_campers) * 100
+    if percentage_met == 0:
+        percentage_met = 1
+
+    variance = pvariance_int([len(_) for _ in session_campers])
+
+    fitness = 1. / count
+    goodness = 1. / percentage_met
+    bestness = (1. / variance) if variance != 0 else 0
     return fitness, goodness, bestness
 
 
@@ -675,7 +773,6 @@ def mutate(ind1, sessions, campers, data_cache, toolbox):
     other_campers_per_activity = data_cache.other_campers_per_activity
     sessions_per_activity = data_cache.sessions_per_activity
     campers_per_group = data_cache.campers_per_group
-    overlapping_sessions = data_cache.overlapping_sessions
 
     #randint = numpy.random.randint
     #choice = numpy.random.choice
@@ -686,12 +783,22 @@ def mutate(ind1, sessions, campers, data_cache, toolbox):
     # Remove fitness values
     del mutant.fitness.values
 
+    # If the parent has been scored by the delta evaluator keep track of
+    # the slots that change so that the child can be scored incrementally.
+    flipped_slots = getattr(mutant, 'flipped_slots', None)
+
+    def set_slot(slot, value):
+        if mutant[slot] != value:
+            mutant[slot] = value
+            if flipped_slots is not None:
+                flipped_slots.append(slot)
+
     # log.debug("Mutating")
 
-    for _ in range(0, randint(0, 100)):
+    index = data_cache.index
+    num_campers = index.num_campers
 
-        # import ipdb
-        # ipdb.set_trace()
+    for _ in range(0, randint(0, 100)):
 
         # Select a session at random
         session_idx = randint(0, len(sessions))
@@ -704,57 +811,42 @@ def mutate(ind1, sessions, campers, data_cache, toolbox):
         # log.debug("Camper: {}".format((str(c))))
 
         # get all family members that have selected the activity.
-        matching_campers = data_cache.campers_per_activity_per_group[act][c.group]
-        # log.debug("Matching campers: {}".format(" ".join(str(_) for _ in
-        #                                                 matching_campers)))
+        matching_camper_indexes = index.family_campers(c.group, act)
 
-        matching_camper_indexes = [campers.index(_) for _ in matching_campers]
         # If they are already allocated to another session, remove them
-        for s in sessions_per_activity[act]:
+        for old_session_idx in index.activity_offsets[index.activity_id[act]]:
             for indx in matching_camper_indexes:
-                # log.debug("Removing {} from {}.".format(
-                #     campers[indx], s))
-                old_session_idx = sessions.index(s) * len(campers)
-                mutant[old_session_idx + indx] = False
+                set_slot(old_session_idx + indx, False)
 
         # Add them to the randomaly allocated session
         for indx in matching_camper_indexes:
-            # log.debug("Adding {} to {}.".format(str(campers[indx]),
-            #                                     str(sessions[session_idx])))
-            mutant[session_idx * len(campers) + indx] = True
+            set_slot(session_idx * num_campers + indx, True)
 
         # Remove the group from any other sessions that overlap
         # with the session we have just added them to.
         # And reallocate them to another session at random.
-        group_campers = campers_per_group[c.group]
-        camper_idxes = [campers.index(_) for _ in group_campers]
-        for overlapping_session in overlapping_sessions[sessions[session_idx]]:
+        camper_idxes = index.group_campers[index.group_id[c.group]]
+        for overlapping_session_idx in index.overlaps[session_idx]:
+            overlapping_session = sessions[overlapping_session_idx]
 
             # Keep track of whether the group is already in the session.
             group_in_session = False
-            overlapping_session_idx = sessions.index(overlapping_session)
+            overlapping_offset = overlapping_session_idx * num_campers
 
             for indx in camper_idxes:
                 # If a member of the group is in this session.
                 # Remember that the group was in the session and remove
                 # the camper from it.
-                if mutant[overlapping_session_idx * len(campers)
-                          + indx]:
-                    # log.debug("Removing {} from {}.".format(
-                    #     str(campers[indx]), str(overlapping_session)))
-
+                if mutant[overlapping_offset + indx]:
                     group_in_session = True
-
-                    mutant[overlapping_session_idx * len(campers)
-                           + indx] = False
+                    set_slot(overlapping_offset + indx, False)
 
             # If we removed a camper from the session we need to try to
             # replace the whole family in another instance of the same
             # session.
             if group_in_session:
-                matching_campers = [_ for _ in group_campers if (
-                        overlapping_session.activity in _.priorities or
-                        overlapping_session.activity in _.others)]
+                matching_camper_indexes = index.family_campers(
+                    c.group, overlapping_session.activity)
 
                 target_sessions = sessions_per_activity[overlapping_session.activity]
 
@@ -768,47 +860,30 @@ def mutate(ind1, sessions, campers, data_cache, toolbox):
                     # TBD: check that target session != session we just took them out of.
 
                     # Is there room in the session for the family?
-                    session_offset = sessions.index(target_session) * len(campers)
+                    target_session_idx = index.session_id[target_session]
+                    session_offset = target_session_idx * num_campers
                     num_in_session = mutant[session_offset:(
                             session_offset +
-                            len(campers))].count(True)
+                            num_campers)].count(True)
 
-                    if (num_in_session + len(matching_campers)
+                    if (num_in_session + len(matching_camper_indexes)
                             > target_session.activity.limit):
-                        # log.debug("tried to put {} into {} but it is "
-                        #           "full.".format(matching_campers[0].group,
-                        #                          target_session))
                         continue
 
                     # Does the session clash with another session that someone
                     # in the family is doing?
-                    overlaps = overlapping_sessions[target_session]
-
-                    found = False
-                    for overlap in overlaps:
-                        if found:
-                            break
-                        offset = sessions.index(overlap) * len(campers)
-                        mutant_session = mutant[offset:offset + len(campers)]
-                        for group_camper in matching_campers:
-                            if mutant_session[campers.index(group_camper)]:
-                                found = True
-                                break
+                    found = any(
+                        mutant[overlap * num_campers + indx]
+                        for overlap in index.overlaps[target_session_idx]
+                        for indx in matching_camper_indexes)
 
                     if found:
-                        # log.debug("tried to put {} into {} but it clashes "
-                        #          "with {}".format(matching_campers[0].group,
-                        #                           target_session,
-                        #                           ",".join([str(_) for _ in overlaps])))
                         continue
 
                     # Put all of the group members that want the activity in
                     # the newly selected session.
-                    for indx in [campers.index(_) for _ in matching_campers]:
-                        # log.debug("Adding {} to {}.".format(str(campers[indx]),
-                        #                                     str(target_session)))
-                        mutant[sessions.index(target_session)
-                               * len(campers) + indx] = True
+                    for indx in matching_camper_indexes:
+                        set_slot(session_offset + indx, True)
 
     return mutant,
 
@@ -864,7 +939,7 @@ def gen_seed_individual(campers, sessions, data_cache, creator):
                     # session and remove them from the list waiting to
                     # be allocated to this activity.
                     for member in f_members:
-                        session_timetable[campers.index(member)] = True
+                        session_timetable[data_cache.index.camper_id[member]] = True
 
                         if member in campers_per_activity[s.activity]:
                             campers_per_activity[s.activity].pop(
@@ -887,46 +962,88 @@ def gen_seed_individual(campers, sessions, data_cache, creator):
     return ind
 
 
+def genome_array(individual):
+    """Return the genome as a NumPy array of booleans."""
+    if isinstance(individual, BitGenome):
+        return individual.as_array()
+    return numpy.fromiter(individual, dtype=bool, count=len(individual))
+
+
+def set_genome(individual, values):
+    """Overwrite the genome of individual with the array values, recording
+    the slots that change for the delta evaluator."""
+    flipped_slots = getattr(individual, 'flipped_slots', None)
+    if flipped_slots is not None:
+        flipped_slots.extend(
+            numpy.flatnonzero(genome_array(individual) != values).tolist())
+    individual[:] = values if isinstance(individual, BitGenome) \
+        else values.tolist()
+
+
+def repair_capacity(x, index, moved_groups):
+    """Move families in moved_groups out of the sessions that are over
+    their limit in the sessions x campers array x (in place).
+
+    A family is moved to another session of the same activity that has
+    room for them and that does not overlap anything that any of its
+    members (not just the ones moving) is doing, which would split the
+    family. If there is no such session they are left where they are."""
+    sizes = x.sum(axis=1)
+    limits = index.session_limit
+
+    for s in numpy.flatnonzero(sizes > limits).tolist():
+        activity = index.session_activity[s]
+        for g in moved_groups:
+            if sizes[s] <= limits[s]:
+                break
+            members = index.group_campers[g]
+            moving = [c for c in members if x[s, c]]
+            if not moving:
+                continue
+
+            targets = [t for t in index.activity_sessions[activity] if t != s]
+            random.shuffle(targets)
+            for t in targets:
+                if sizes[t] + len(moving) > limits[t]:
+                    continue
+                if x[numpy.ix_(index.overlaps[t], members)].any():
+                    continue
+                x[s, moving] = False
+                x[t, moving] = True
+                sizes[s] -= len(moving)
+                sizes[t] += len(moving)
+                break
+
+
 def mate(ind1, ind2, campers, sessions):
     """Mate two timetables by selecting families at random and swaping
-    their schedules from one timetable to the other."""
-
-    # # create a list of all families to keep track of which have been
-    # # considered.
-    # families = list(set([_.group for _ in campers]))
-
-    # # Optimsations
-    # len_campers = len(campers)
-    # sessions_enum = enumerate(sessions)
-    # campers_enum = enumerate(campers)
-
-    # # for each family randomly swap the families schedule between
-    # # the two timetables.
-    # for c in campers:
-    #     # Stop if we have considered every family.
-    #     if len(families) == 0:
-    #             break
-
-    #     # Only proced of the family has not already been swapped.
-    #     if (c.group in families):
-    #         # remove from the list so that we do not process this
-    #         # family again.
-    #         families.pop(families.index(c.group))
-
-    #         # Flip a coin to decide whether to swap the schedules.
-    #         if random.choice([True, False]):
-    #             # search for each occurance of this family
-    #             # in the timetable. Then swap their schedule
-    #             # from one timetable to the other.
-    #             for indx in [ (s_indx*len_campers) + c_indx
-    #                           for s_indx, s in sessions_enum
-    #                           for c_indx, l_c in campers_enum
-    #                           if l_c.group == c.group]:
-    #                 ind2[indx], ind1[indx] = ind1[indx], ind2[indx]
-
-    # # Remove fitness values
-    # del ind1.fitness.values
-    # del ind2.fitness.values
+    their schedules from one timetable to the other.
+
+    A family's schedule is all of the slots of its campers, in every
+    session, so swapping it cannot split the family or give a camper a
+    clash. It can overfill sessions, so afterwards the swapped families
+    are moved out of any session that is over its limit where there is
+    room for them elsewhere (see repair_capacity)."""
+    index = Individual.problem_index(campers, sessions)
+
+    # Flip a coin for each family to decide whether to swap its schedule.
+    swapped = [g for g in range(len(index.groups))
+               if random.choice([True, False])]
+    if not swapped:
+        return (ind1, ind2)
+
+    slots = numpy.concatenate([index.family_slots[g] for g in swapped])
+    first = genome_array(ind1)
+    second = genome_array(ind2)
+    first[slots], second[slots] = second[slots], first[slots]
+
+    for child, values in ((ind1, first), (ind2, second)):
+        x = values.reshape(index.num_sessions, index.num_campers)
+        repair_capacity(x, index, swapped)
+        set_genome(child, values)
+
+        # Remove fitness values
+        del child.fitness.values
 
     return (ind1, ind2)
 
@@ -936,8 +1053,10 @@ def gen_individual(seed_individual, toolbox):
 
 
 def print_individual(individual, campers):
-    status_out = ["Fitness = {}".format(individual.fitness(debug=True)),
-                  "Goodness = {}\n\n".format(individual.goodness(campers, debug=True))]
+    individual.summary_file.write(individual.violations().summary())
+
+    status_out = ["Fitness = {}".format(individual.fitness()),
+                  "Goodness = {}\n\n".format(individual.goodness(campers))]
 
 
     # Holder for output
@@ -949,12 +1068,6 @@ def print_individual(individual, campers):
     start_days = sorted(set([_.start.date() for _ in individual.sessions]))
     assert len(start_days) == 2, f"Wierd, the programme is not two days long: number of days == {len(start_days)}"
 
-    # A fake session class so that we can use the get_overlapping_sessions function.
-    @dataclass
-    class _Session:
-        start: datetime
-        end: datetime
-
     # For each day on the programme
     for day in start_days:
 
@@ -968,24 +1081,25 @@ def print_individual(individual, campers):
         while hour < latest_end:
 
             # Look for any sessions that are active. We want to remove any hour slots that have no activites (e.g. lunchtime)
-            over_lapping_sessions = get_overlapping_sessions(
-                _Session(hour, hour + timedelta(minutes=59)),
-                individual.sessions)
+            over_lapping_sessions = individual.index.sessions_overlapping(
+                hour, hour + timedelta(minutes=59))
             if len(over_lapping_sessions):
                 hours.append(hour)
             hour += timedelta(hours=1)
 
         # We now have a list of hour slots for this day. Now we need for find anyone that is doing nothing at that time
         for hour in hours:
-            active_sessions = get_overlapping_sessions(
-                _Session(hour, hour + timedelta(minutes=59)),
-                individual.sessions)
-            active_campers = []
+            active_sessions = individual.index.sessions_overlapping(
+                hour, hour + timedelta(minutes=59))
+            active_campers = 0
+            active_groups = set()
             for active_session in active_sessions:
-                active_campers += individual.session_inst_map[active_session].campers
+                inst = individual.session_inst_map[active_session]
+                active_campers |= inst.camper_bits
+                active_groups |= inst.family_groups
 
-            active_groups = sorted(set([_.group for _ in active_campers]))
-            inactive_campers = [_ for _ in campers if _ not in active_campers]
+            inactive_campers = [_ for _ in campers
+                                if not active_campers >> individual.index.camper_id[_] & 1]
             inactive_adult_campers = sorted([_.name for _ in inactive_campers if _.age_group == "Adult (over 18 years)"])
 
             inactive_adult_campers_out.append("{:<20}".format(hour.strftime(DATEFORMAT)))
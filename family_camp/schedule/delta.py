@@ -0,0 +1,198 @@
+# coding: utf-8
+"""Incremental (delta) evaluation of timetables.
+
+mutate() only changes a handful of slots, so rather than scoring every
+child from scratch we keep the partial scores of the parent (per session,
+per family/session and per camper/activity counts) and update them for
+just the slots that were flipped.
+
+An evaluated individual carries two extra attributes:
+
+  partial_scores  - the PartialScores for its genome.
+  flipped_slots   - the slots that have been toggled since partial_scores
+                    was calculated (filled in by mutate(), and by mate()
+                    through set_genome()).
+
+The parent's PartialScores object is shared by its clones and is never
+modified in place, a copy is taken before the flips are applied.
+"""
+import numpy
+
+from .numpy_fitness import NumpyEvaluator
+
+
+class PartialScores:
+    """The cached per session, per family and per camper partial scores
+    that the three objectives are built from."""
+
+    def __init__(self, in_session, group_count, camper_clash, family_split,
+                 camper_penalty, met):
+        # Number of campers in each session.
+        self.in_session = in_session
+        # sessions x families: number of members of the family in the
+        # session.
+        self.group_count = group_count
+        # Number of clashes each camper is involved in.
+        self.camper_clash = camper_clash
+        # Number of times each family is split across overlapping
+        # sessions.
+        self.family_split = family_split
+        # Missing, unwanted and duplicate activities for each camper.
+        self.camper_penalty = camper_penalty
+        # Each camper's contribution to the goodness.
+        self.met = met
+
+    def copy(self):
+        return PartialScores(self.in_session.copy(),
+                             self.group_count.copy(),
+                             self.camper_clash.copy(),
+                             self.family_split.copy(),
+                             self.camper_penalty.copy(),
+                             self.met.copy())
+
+
+class DeltaEvaluator(NumpyEvaluator):
+    """Evaluate individuals by updating their parent's partial scores.
+
+    Only the campers whose slots have been flipped, and their families,
+    are rescored. The children of mate() are rescored the same way, as
+    set_genome records the slots that the swap and the capacity repair
+    changed. Individuals without a parent score (the initial population)
+    are scored in full.
+
+    The evaluator stores the new partial scores on the individual, so it
+    must run in the same process as the generation loop (i.e. with the
+    builtin map)."""
+
+    def __init__(self, campers, sessions, index=None):
+        NumpyEvaluator.__init__(self, campers, sessions, index)
+        self.group_of_camper = self.camper_group.argmax(axis=1)
+
+    def _camper_scores(self, x, rows):
+        """Return the clash count, violation count and goodness
+        contribution for the campers in the columns of x.
+
+        rows selects the matching rows of the campers x activities
+        masks."""
+        clash = (x * (self.overlaps @ x)).sum(axis=0).astype(numpy.int64)
+
+        per_activity = x.T @ self.session_activity
+        doing = per_activity > 0
+        penalty = ((self.priorities[rows] & ~doing).sum(axis=1) +
+                   (doing & ~self.wanted[rows]).sum(axis=1) +
+                   numpy.maximum(per_activity - 1, 0).sum(axis=1)
+                   ).astype(numpy.int64)
+
+        num_others = self.num_others[rows]
+        met = numpy.where(
+            num_others == 0, 1,
+            (self.others[rows] & doing).sum(axis=1) /
+            numpy.where(num_others == 0, 1, num_others))
+
+        return clash, penalty, met
+
+    def _family_split(self, group_count):
+        families = (group_count > 0).astype(numpy.float32)
+        return (families * (self.overlaps @ families)).sum(
+            axis=0).astype(numpy.int64)
+
+    def full_scores(self, individual):
+        """Calculate the partial scores for individual from scratch."""
+        x = self.matrix(individual)
+        group_count = (x @ self.camper_group).astype(numpy.int64)
+        clash, penalty, met = self._camper_scores(x, slice(None))
+
+        return PartialScores(
+            x.sum(axis=1).astype(numpy.int64), group_count, clash,
+            self._family_split(group_count), penalty, met)
+
+    def apply_flips(self, scores, individual, flips):
+        """Update scores (in place) for the slots in flips.
+
+        individual is the genome after the flips have been made."""
+
+        # A slot that has been flipped an even number of times is
+        # unchanged.
+        slots, times = numpy.unique(numpy.asarray(flips, dtype=numpy.int64),
+                                    return_counts=True)
+        changed = slots[times % 2 == 1]
+        if not len(changed):
+            return
+
+        num_campers = self.num_campers
+        sessions, campers = numpy.divmod(changed, num_campers)
+        changed_campers = numpy.unique(campers)
+
+        # sessions x changed campers, before and after the flips. If most
+        # of the campers have changed it is quicker to convert the whole
+        # genome than to pick out the slots one at a time.
+        if isinstance(individual, numpy.ndarray):
+            after = self.matrix(individual)[:, changed_campers]
+        elif len(changed_campers) * 4 > num_campers:
+            after = self.matrix(individual)[:, changed_campers]
+        else:
+            after = numpy.array(
+                [[individual[s * num_campers + c]
+                  for c in changed_campers.tolist()]
+                 for s in range(self.num_sessions)], dtype=numpy.float32)
+        flipped = numpy.zeros_like(after)
+        flipped[sessions, numpy.searchsorted(changed_campers, campers)] = 1
+        difference = after - (after != flipped)
+
+        scores.in_session += difference.sum(axis=1).astype(numpy.int64)
+        scores.group_count += (
+            difference @ self.camper_group[changed_campers]).astype(
+                numpy.int64)
+
+        clash, penalty, met = self._camper_scores(after, changed_campers)
+        scores.camper_clash[changed_campers] = clash
+        scores.camper_penalty[changed_campers] = penalty
+        scores.met[changed_campers] = met
+
+        groups = numpy.unique(self.group_of_camper[changed_campers])
+        scores.family_split[groups] = self._family_split(
+            scores.group_count[:, groups])
+
+    def values(self, scores):
+        """Return the (fitness, goodness, bestness) tuple for scores."""
+        in_session = scores.in_session
+        count = (1 +
+                 int(scores.camper_clash.sum()) +
+                 int(scores.family_split.sum()) +
+                 int(numpy.maximum(in_session - self.limits, 0).sum()) +
+                 int(numpy.maximum(self.mins - in_session, 0).sum()) +
+                 int(scores.camper_penalty.sum()))
+
+        # cumsum adds in camper order, as Individual.goodness does.
+        total = numpy.cumsum(scores.met)[-1] if len(scores.met) else 0
+        percentage_met = (total / self.num_campers) * 100
+        if percentage_met == 0:
+            percentage_met = 1
+
+        variance = self.variance(in_session)
+
+        fitness = 1. / count
+        goodness = 1. / float(percentage_met)
+        bestness = (1. / float(variance)) if variance != 0 else 0
+        return fitness, goodness, bestness
+
+    def scores(self, individual):
+        """Return the partial scores for individual, reusing the parent's
+        scores if they are available."""
+        parent = getattr(individual, 'partial_scores', None)
+        flips = getattr(individual, 'flipped_slots', None)
+
+        if parent is None or flips is None:
+            return self.full_scores(individual)
+
+        scores = parent.copy()
+        self.apply_flips(scores, individual, flips)
+        return scores
+
+    def __call__(self, individual):
+        scores = self.scores(individual)
+
+        individual.partial_scores = scores
+        individual.flipped_slots = []
+
+        return self.values(scores)
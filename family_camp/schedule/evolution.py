@@ -0,0 +1,246 @@
+# coding: utf-8
+"""The generational loop of the genetic algorithm.
+
+ea_simple is deap.algorithms.eaSimple with the extras that generate
+needs: whole generations scored by evaluate_invalid (through the fitness
+cache and toolbox.evaluate_population, if they are there), repair of the
+offspring, StoppingCriteria, checkpoints and the perf log.
+"""
+import time
+import logging
+from copy import deepcopy
+
+from deap import tools, algorithms
+
+from .fitness_cache import genome_key
+from .perf import PhaseTimer
+from .repair import repair_offspring
+
+log = logging.getLogger(__name__)
+
+
+def evaluate_invalid(individuals, toolbox_, cache=None, timer=None):
+    """Evaluate the individuals that do not have a valid fitness.
+
+    If a FitnessCache is given, individuals whose genome is already in it
+    (or appears earlier in the same batch) are not evaluated again.
+
+    If a perf.PhaseTimer is given the time spent in toolbox.map (or
+    toolbox.evaluate_population) is added to its "map" phase.
+
+    Returns the number of evaluations."""
+    timer = timer or PhaseTimer()
+    invalid_ind = [ind for ind in individuals if not ind.fitness.valid]
+
+    if cache is None:
+        pending = [[ind] for ind in invalid_ind]
+        keys = None
+    else:
+        # genome key => [individuals with that genome]
+        waiting = {}
+        for ind in invalid_ind:
+            key = genome_key(ind)
+            if key in waiting:
+                # A copy of one that is already going to be evaluated.
+                cache.hits += 1
+                waiting[key].append(ind)
+                continue
+            values = cache.get(key)
+            if values is None:
+                waiting[key] = [ind]
+            else:
+                ind.fitness.values = values
+        keys = list(waiting.keys())
+        pending = list(waiting.values())
+
+    to_evaluate = [inds[0] for inds in pending]
+    with timer('map'):
+        if hasattr(toolbox_, "evaluate_population"):
+            fitnesses = toolbox_.evaluate_population(to_evaluate)
+        else:
+            fitnesses = list(toolbox_.map(toolbox_.evaluate, to_evaluate))
+
+    for i, (inds, fit) in enumerate(zip(pending, fitnesses)):
+        for ind in inds:
+            ind.fitness.values = fit
+        if keys is not None:
+            cache.put(keys[i], fit)
+
+    return len(to_evaluate)
+
+
+class StoppingCriteria:
+    """Decide when ea_simple should stop before ngen generations.
+
+    target_fitness  - stop once the best individual has at most this many
+                      violations (1 means none, see Individual.fitness).
+    target_goodness - ... and at least this percentage of the other
+                      activities met. If only one of the targets is given
+                      the other is not checked.
+    time_limit      - stop after this many seconds.
+    stagnation      - stop if the best fitness has not improved for this
+                      many generations.
+
+    Calling the object with the generation number and the best individual
+    returns the reason for stopping, or None to carry on."""
+
+    def __init__(self, target_fitness=None, target_goodness=None,
+                 time_limit=None, stagnation=None):
+        self.target_fitness = target_fitness
+        self.target_goodness = target_goodness
+        self.time_limit = time_limit
+        self.stagnation = stagnation
+        self.start()
+
+    def start(self):
+        self.started = time.monotonic()
+        self.best = None
+        self.best_gen = 0
+
+    def __call__(self, gen, best):
+        if self.best is None or best.fitness > self.best:
+            self.best = deepcopy(best.fitness)
+            self.best_gen = gen
+
+        # fitness.values holds the reciprocals of the violation count and
+        # the percentage met.
+        count = 1. / best.fitness.values[0]
+        percentage_met = 1. / best.fitness.values[1]
+        if ((self.target_fitness is not None or
+             self.target_goodness is not None) and
+                (self.target_fitness is None or
+                 round(count) <= self.target_fitness) and
+                (self.target_goodness is None or
+                 percentage_met >= self.target_goodness)):
+            return "reached the target ({} violations, {:.2f}% met)".format(
+                round(count) - 1, percentage_met)
+
+        if (self.time_limit is not None and
+                time.monotonic() - self.started >= self.time_limit):
+            return "time limit of {}s reached".format(self.time_limit)
+
+        if (self.stagnation is not None and
+                gen - self.best_gen >= self.stagnation):
+            return "no improvement since generation {}".format(
+                self.best_gen)
+
+        return None
+
+
+def ea_simple(population, toolbox_, cxpb, mutpb, ngen, stats=None,
+              halloffame=None, verbose=__debug__, cache=None, stop=None,
+              checkpoint=None, start_gen=0, logbook=None, repair_rate=0.,
+              perf=None):
+    """deap.algorithms.eaSimple, but with the evaluation of each
+    generation done by evaluate_invalid so that the whole population can
+    be scored in one batch.
+
+    If a FitnessCache is given the number of cache hits and misses in
+    each generation are added to the logbook.
+
+    If stop (e.g. a StoppingCriteria) is given it is called with the
+    generation number and the best individual after each generation, and
+    the run ends early if it returns a reason.
+
+    If checkpoint (e.g. a checkpoint.Checkpointer) is given it is called
+    with the state at the end of each generation, and with force=True
+    when the run ends. To resume a run, pass the population (already
+    evaluated) and logbook from the checkpoint with start_gen set to its
+    generation.
+
+    If repair_rate is given, that fraction of the changed offspring is
+    improved by toolbox.repair (see repair.Repair) each generation.
+
+    If perf (a perf.PerfLog) is given the time taken by each phase of
+    every generation is written to it."""
+    if logbook is None:
+        logbook = tools.Logbook()
+        logbook.header = (['gen', 'nevals'] +
+                          (['hits', 'misses'] if cache is not None else []) +
+                          (stats.fields if stats else []))
+
+    timer = PhaseTimer()
+
+    def record_generation(gen, nevals, lookups):
+        with timer('stats'):
+            record = stats.compile(population) if stats else {}
+        if cache is not None:
+            record['hits'] = cache.hits - lookups[0]
+            record['misses'] = cache.misses - lookups[1]
+        logbook.record(gen=gen, nevals=nevals, **record)
+        if verbose:
+            print(logbook.stream)
+
+    def record_perf(gen, nevals, lookups):
+        phases = timer.reset()
+        if perf is not None:
+            perf.record(gen, nevals, phases, population,
+                        *([cache.hits - lookups[0], cache.misses - lookups[1]]
+                          if cache is not None else []))
+
+    def cache_lookups():
+        return (cache.hits, cache.misses) if cache is not None else None
+
+    if start_gen == 0:
+        lookups = cache_lookups()
+        with timer('evaluate'):
+            nevals = evaluate_invalid(population, toolbox_, cache, timer)
+
+        if halloffame is not None:
+            with timer('halloffame'):
+                halloffame.update(population)
+
+        record_generation(0, nevals, lookups)
+        record_perf(0, nevals, lookups)
+
+    # Begin the generational process
+    gen = start_gen
+    for gen in range(start_gen + 1, ngen + 1):
+        # Select the next generation individuals
+        with timer('select'):
+            offspring = toolbox_.select(population, len(population))
+
+        # Vary the pool of individuals
+        with timer('vary'):
+            offspring = algorithms.varAnd(offspring, toolbox_, cxpb, mutpb)
+
+        if repair_rate:
+            with timer('repair'):
+                repair_offspring(offspring, toolbox_, repair_rate)
+
+        lookups = cache_lookups()
+        with timer('evaluate'):
+            nevals = evaluate_invalid(offspring, toolbox_, cache, timer)
+
+        # Update the hall of fame with the generated individuals
+        if halloffame is not None:
+            with timer('halloffame'):
+                halloffame.update(offspring)
+
+        # Replace the current population by the offspring
+        population[:] = offspring
+
+        # Append the current generation statistics to the logbook
+        record_generation(gen, nevals, lookups)
+
+        if checkpoint is not None:
+            with timer('checkpoint'):
+                checkpoint(gen, population, halloffame, logbook)
+
+        record_perf(gen, nevals, lookups)
+
+        if stop is not None:
+            reason = stop(gen, tools.selBest(population, 1)[0])
+            if reason:
+                log.info("Stopping after generation {}: {}".format(
+                    gen, reason))
+                break
+
+    if checkpoint is not None:
+        checkpoint(gen, population, halloffame, logbook, force=True)
+
+    if cache is not None:
+        log.info("Fitness cache hit rate: {:.1%} ({} hits, {} misses)".format(
+            cache.hit_rate(), cache.hits, cache.misses))
+
+    return population, logbook
@@ -0,0 +1,56 @@
+# coding: utf-8
+"""Memoization of fitness values.
+
+Tournament selection copies the fittest individuals many times and
+mutate() can leave an individual unchanged, so a generation contains a lot
+of genomes that have already been scored. FitnessCache remembers the
+values for the most recently used genomes, keyed by a hash of the packed
+genome.
+
+The cache lives in the process running the generation loop and is
+consulted before the individuals are handed to toolbox.map, so only the
+genomes that miss are sent to the workers and every worker benefits from
+the values that any of them has calculated.
+"""
+import hashlib
+from collections import OrderedDict
+
+from .bitgenome import pack
+
+
+def genome_key(individual):
+    """Return a short, fast hash of the individual's genome."""
+    return hashlib.blake2b(pack(individual), digest_size=16).digest()
+
+
+class FitnessCache:
+    """A bounded least recently used map of genome key => fitness values."""
+
+    def __init__(self, maxsize=100000):
+        self.maxsize = maxsize
+        self.hits = 0
+        self.misses = 0
+        self._values = OrderedDict()
+
+    def __len__(self):
+        return len(self._values)
+
+    def get(self, key):
+        """Return the values for key or None, counting the hit or miss."""
+        values = self._values.get(key)
+        if values is None:
+            self.misses += 1
+        else:
+            self.hits += 1
+            self._values.move_to_end(key)
+        return values
+
+    def put(self, key, values):
+        self._values[key] = values
+        self._values.move_to_end(key)
+        while len(self._values) > self.maxsize:
+            self._values.popitem(last=False)
+
+    def hit_rate(self):
+        lookups = self.hits + self.misses
+        return self.hits / lookups if lookups else 0.
@@ -6,24 +6,23 @@ import csv
 import threading
 from functools import partial
 
-from deap import base, creator, tools, algorithms
+from deap import base, creator, tools
 import numpy
 from deap.tools import Statistics
 
-# Work around a Python3.10 depreciation issue. Scoop has not caught up yet.
-try:
-    from scoop import futures
-except ImportError:
-    import collections.abc
-    #hyper needs the four following aliases to be done manually.
-    collections.Iterable = collections.abc.Iterable
-    collections.Mapping = collections.abc.Mapping
-    collections.MutableSet = collections.abc.MutableSet
-    collections.MutableMapping = collections.abc.MutableMapping
-    from scoop import futures
-
 
 from .deep import *
+from .bitgenome import BitGenome
+from .fitness_cache import FitnessCache
+from .checkpoint import Checkpointer, load_checkpoint
+from .backends import register_evaluator, setup_backend
+from .repair import Repair
+from .evolution import StoppingCriteria, ea_simple
+from .seeding import seed_population, mean_hamming_distance
+from .greedy import greedy_schedule
+from .perf import PerfLog
+from .anneal import run_anneal
+from .tabu import run_tabu
 
 import logging
 
@@ -33,8 +32,16 @@ DATEFORMAT = "%a %H:%M"
 CACHE = ".cache.pickle"
 
 def mycopy(old):
-    new = old.__class__(old[:])
+    # Both list and BitGenome copy themselves when given an instance.
+    new = old.__class__(old)
     new.fitness = deepcopy(old.fitness)
+
+    # Carry the parent's scores (shared, they are never modified) and the
+    # slots changed since they were calculated over to the clone for the
+    # delta evaluator.
+    if getattr(old, 'partial_scores', None) is not None:
+        new.partial_scores = old.partial_scores
+        new.flipped_slots = list(old.flipped_slots)
     return new
 
 
@@ -44,6 +51,8 @@ def setup_toolbox(acts, sessions, campers, data_cache, toolbox_, creator_):
 
     creator_.create("FitnessMin", base.Fitness, weights=(5.0, -2.0, -1.0))
     creator_.create("Individual", list, fitness=creator_.FitnessMin)
+    creator_.create("PackedIndividual", BitGenome,
+                    fitness=creator_.FitnessMin)
 
     toolbox_.register("clone", mycopy)
     toolbox_.register("individual", partial(gen_individual, toolbox=toolbox),
@@ -59,7 +68,8 @@ def setup_toolbox(acts, sessions, campers, data_cache, toolbox_, creator_):
     toolbox_.register("select", tools.selTournament, tournsize=20)
     toolbox_.register("evaluate", partial(evaluate, campers=campers,
                                          sessions=sessions))
-    toolbox_.register("map", futures.map)
+    # run() registers the map of the chosen execution backend.
+    toolbox_.register("map", map)
 
     return acts, sessions, campers, data_cache
 
@@ -67,18 +77,58 @@ def setup_toolbox(acts, sessions, campers, data_cache, toolbox_, creator_):
 setup_toolbox(acts, sessions, campers, data_cache, toolbox, creator)
 
 
+def genome_type(name, creator_):
+    """Return the individual class for the named genome representation."""
+    if name == 'list':
+        return creator_.Individual
+    elif name == 'bits':
+        return creator_.PackedIndividual
+    raise ValueError("Unknown genome: {}".format(name))
+
+
 def run(args):
 
-    if args['<timetable>']:
-        log.info('Reading seed individual from {}.'.format(args['<timetable>']))
-        with open(args['<timetable>']) as csvfile:
-            individual = individual_from_list(
+    log.info('Using the {} evaluator.'.format(args['--evaluator']))
+    evaluator = register_evaluator(args['--evaluator'], toolbox, campers,
+                                   sessions)
+
+    backend = setup_backend(
+        args['--backend'], toolbox, evaluator,
+        int(args['--workers']) if args['--workers'] else None)
+    log.info('Using the {} backend.'.format(backend.name))
+
+    individual_type = genome_type(args['--genome'], creator)
+
+    repair_rate = float(args['--repair-rate'])
+    repair_moves = int(args['--repair-moves']) or None
+    if repair_rate:
+        toolbox.register("repair", Repair(campers, sessions, data_cache.index,
+                                          creator.FitnessMin.weights,
+                                          max_moves=repair_moves))
+
+    imported = []
+    for path in ([args['<timetable>']] if args['<timetable>'] else []) + \
+            args['--import']:
+        log.info('Reading seed individual from {}.'.format(path))
+        with open(path) as csvfile:
+            imported.append(individual_from_list(
                 list(csv.reader(csvfile, delimiter=',')),
-                campers, acts, sessions)
+                campers, acts, sessions, index=data_cache.index))
+    # The greedy timetable is always one of the seeds.
+    imported.append(greedy_schedule(data_cache.index))
+
+    stop = StoppingCriteria(
+        target_fitness=(int(args['--target-fitness'])
+                        if args['--target-fitness'] else None),
+        target_goodness=(float(args['--target-goodness'])
+                         if args['--target-goodness'] else None),
+        time_limit=(float(args['--time-limit']) * 60
+                    if args['--time-limit'] else None),
+        stagnation=(int(args['--stagnation'])
+                    if args['--stagnation'] else None))
 
-        toolbox.register("individual",
-                         partial(gen_individual, toolbox=toolbox),
-                         Individual(individual, campers, sessions))
+    cache_size = int(args['--cache-size'])
+    cache = FitnessCache(cache_size) if cache_size > 0 else None
 
     outdir = args['<outdir>']
 
@@ -92,6 +142,73 @@ def run(args):
     if not os.path.exists(outdir):
         os.mkdir(outdir)
 
+    if args['--greedy']:
+        individual = individual_type(imported[-1])
+        individual.fitness.values = toolbox.evaluate(individual)
+        log.info('Greedy timetable fitness {}.'.format(
+            individual.fitness.values))
+        hof.update([individual])
+        hof.dump_to_dir()
+        backend.close()
+        return
+
+    # The single trajectory engines polish the first timetable given, or
+    # the greedy one.
+    if args['--engine'] == 'anneal':
+        log.info('Annealing {} chains.'.format(args['--chains']))
+        try:
+            run_anneal(
+                imported[0], individual_type, hof,
+                chains=int(args['--chains']),
+                workers=int(args['--workers']) if args['--workers'] else None,
+                steps=int(args['--steps']),
+                start_temperature=float(args['--temperature']),
+                end_temperature=float(args['--final-temperature']),
+                cooling=args['--cooling'],
+                time_limit=(float(args['--time-limit']) * 60
+                            if args['--time-limit'] else None))
+        finally:
+            hof.dump_to_dir()
+            backend.close()
+        return
+    elif args['--engine'] == 'tabu':
+        log.info('Tabu search.')
+        try:
+            run_tabu(
+                imported[0], individual_type, hof,
+                iterations=int(args['--iterations']),
+                tenure=int(args['--tenure']),
+                full=args['--full-neighbourhood'],
+                time_limit=(float(args['--time-limit']) * 60
+                            if args['--time-limit'] else None))
+        finally:
+            hof.dump_to_dir()
+            backend.close()
+        return
+    elif args['--engine'] != 'ga':
+        raise ValueError("Unknown engine: {}".format(args['--engine']))
+
+    checkpoint = Checkpointer(os.path.join(outdir, "checkpoint.pickle"),
+                              float(args['--checkpoint-interval']) * 60)
+    perf = PerfLog(os.path.join(outdir, "perf.jsonl"),
+                   evaluator=args['--evaluator'], backend=backend.name,
+                   workers=getattr(backend, 'workers', 1),
+                   genome=args['--genome'], islands=int(args['--islands']),
+                   repair_rate=repair_rate, repair_moves=repair_moves)
+
+    if args['--resume']:
+        log.info('Resuming from {}.'.format(args['--resume']))
+        (start_gen, population, logbook) = load_checkpoint(
+            args['--resume'], individual_type, hof)
+    else:
+        (start_gen, population, logbook) = (0, seed_population(
+            toolbox, individual_type, 2000, data_cache.index,
+            int(args['--seeds']), imported), None)
+        log.info('Seeded the population from {} timetables, mean Hamming '
+                 'distance {:.1f}.'.format(
+                     int(args['--seeds']) + len(imported),
+                     mean_hamming_distance(population)))
+
     def responder():
         while sys.stdin.readline():
             print("Dumping current Hall of Fame to {}".format(outdir))
@@ -101,15 +218,48 @@ def run(args):
     t.daemon = True
     t.start()
 
+    islands = int(args['--islands'])
+    if islands and args['--resume']:
+        raise ValueError("--resume is not supported with --islands")
+
     try:
-        (timetables, log_) = algorithms.eaSimple(
-            toolbox.population(),
-            toolbox, cxpb=0.2, mutpb=0.5, ngen=30000,
+        if islands:
+            from .islands import run_islands
+            log.info('Evolving {} islands.'.format(islands))
+            (timetables, log_) = run_islands(
+                population, individual_type, islands,
+                ngen=int(args['--generations']),
+                cxpb=0.2, mutpb=0.5,
+                halloffame=hof,
+                evaluator=args['--evaluator'],
+                genome=args['--genome'],
+                interval=int(args['--migration-interval']),
+                migrants=int(args['--migrants']),
+                topology=args['--topology'],
+                cache_size=cache_size,
+                stop=stop,
+                repair_rate=repair_rate,
+                repair_moves=repair_moves)
+            return
+
+        (timetables, log_) = ea_simple(
+            population,
+            toolbox, cxpb=0.2, mutpb=0.5,
+            ngen=int(args['--generations']),
             stats=stats,
             halloffame=hof,
-            verbose=True)
+            verbose=True,
+            cache=cache,
+            stop=stop,
+            checkpoint=checkpoint,
+            start_gen=start_gen,
+            logbook=logbook,
+            repair_rate=repair_rate,
+            perf=perf)
     except Exception as E:
         raise E
     finally:
         # Try to dump the current timetable what ever happens.
         hof.dump_to_dir()
+        backend.close()
+        perf.close()
@@ -0,0 +1,97 @@
+# coding: utf-8
+"""Most constrained family first greedy scheduler.
+
+greedy_schedule builds a timetable without any randomness:
+
+  1. The families are ordered by how hard they are to place: the number
+     of priorities they have, then how large they are compared with the
+     limits of the activities they want, then (fewest first) how many
+     of the sessions of the activities they want do not overlap a
+     session of another activity they want.
+
+  2. Each family in turn has its priorities placed, and then each family
+     in turn has its other activities placed, the activities with the
+     fewest sessions first. The members that asked for an activity are
+     put in the session that fits them best: one that is still under its
+     minimum if there is one, otherwise the one that has the least room
+     left once they are in. Sessions that are too full, or that overlap
+     something the family is already doing, are skipped.
+
+Activities that cannot be placed are left out, so the result is close to
+feasible rather than guaranteed to be feasible. It is used as a seed for
+the GA and by "generate --greedy".
+"""
+
+
+def family_requests(index):
+    """Return group id => [(activity id, [camper ids], has priority)]."""
+    requests = [[] for _ in index.group_campers]
+    for (group, activity), members in sorted(
+            index.family_activity_campers.items()):
+        priority = any(activity in index.camper_priorities[c]
+                       for c in members)
+        requests[group].append((activity, members, priority))
+    return requests
+
+
+def family_order(index, requests):
+    """Return the group ids, most constrained first."""
+    def constraint(group):
+        wanted = requests[group]
+        priorities = sum(1 for _, _, priority in wanted if priority)
+        size = max((len(members) /
+                    max(1, min(index.session_limit[s]
+                               for s in index.activity_sessions[activity]))
+                    for activity, members, _ in wanted
+                    if index.activity_sessions[activity]), default=0)
+        available = 0
+        for activity, _, _ in wanted:
+            others = set(s for other, _, _ in wanted if other != activity
+                         for s in index.activity_sessions[other])
+            available += sum(1 for s in index.activity_sessions[activity]
+                             if others.isdisjoint(index.overlaps[s]))
+        return (-priorities, -size, available, group)
+
+    return sorted(range(len(index.group_campers)), key=constraint)
+
+
+def greedy_schedule(index):
+    """Return a timetable genome (a list of bools) for the problem."""
+    num_campers = index.num_campers
+    genome = [False] * (index.num_sessions * num_campers)
+
+    requests = family_requests(index)
+    in_session = [0] * index.num_sessions
+    # group id => the session ids the family is doing something in.
+    busy = [set() for _ in index.group_campers]
+
+    order = family_order(index, requests)
+    placements = [(group, activity, members)
+                  for priorities in (True, False)
+                  for group in order
+                  for activity, members, priority in sorted(
+                      requests[group],
+                      key=lambda _: (len(index.activity_sessions[_[0]]),
+                                     _[0]))
+                  if priority == priorities]
+
+    for group, activity, members in placements:
+        best = None
+        for s in index.activity_sessions[activity]:
+            room = index.session_limit[s] - in_session[s] - len(members)
+            if room < 0 or any(o in busy[group]
+                               for o in index.overlaps[s]):
+                continue
+            fit = (in_session[s] >= index.session_min[s], room, s)
+            if best is None or fit < best:
+                best = fit
+        if best is None:
+            continue
+
+        s = best[-1]
+        for c in members:
+            genome[s * num_campers + c] = True
+        in_session[s] += len(members)
+        busy[group].add(s)
+
+    return genome
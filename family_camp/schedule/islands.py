@@ -0,0 +1,170 @@
+# coding: utf-8
+"""Island model version of the generate run.
+
+Rather than farming out every evaluation, the population is split into
+islands and each island is evolved by ea_simple in a worker process, with
+the usual mutate, mate and select operators, for a number of generations
+(an epoch) at a time. Between epochs the best few individuals of each
+island migrate to another island, replacing its worst, and the islands'
+hall of fame entries are merged into the run's hall of fame.
+
+Only packed genomes, fitness values and random states cross the process
+boundary, and only once an epoch, so the islands scale with the number of
+cores.
+"""
+import random
+import logging
+from concurrent.futures import ProcessPoolExecutor
+from copy import deepcopy
+
+from deap import tools
+
+from .checkpoint import pack_individuals, unpack_individuals
+from .fitness_cache import FitnessCache
+
+log = logging.getLogger(__name__)
+
+# Set up in each worker by init_worker.
+_worker = {}
+
+
+def init_worker(evaluator, genome, cache_size, repair_rate=0.,
+                repair_moves=20):
+    """Pool initializer, register the evaluator in the worker's toolbox.
+
+    The module level set up of generate_schedule (loading the problem and
+    building the toolbox) is inherited or rerun by the worker."""
+    from . import generate_schedule
+
+    toolbox = generate_schedule.toolbox
+    generate_schedule.register_evaluator(
+        evaluator, toolbox, generate_schedule.campers,
+        generate_schedule.sessions)
+    # The island is evolved in this process.
+    toolbox.register("map", map)
+    if repair_rate:
+        toolbox.register("repair", generate_schedule.Repair(
+            generate_schedule.campers, generate_schedule.sessions,
+            generate_schedule.data_cache.index,
+            generate_schedule.creator.FitnessMin.weights,
+            max_moves=repair_moves))
+
+    _worker['toolbox'] = toolbox
+    _worker['ea_simple'] = generate_schedule.ea_simple
+    _worker['individual_type'] = generate_schedule.genome_type(
+        genome, generate_schedule.creator)
+    _worker['cache'] = FitnessCache(cache_size) if cache_size > 0 else None
+    _worker['repair_rate'] = repair_rate
+
+
+def evolve_island(island, length, rng_state, ngen, cxpb, mutpb,
+                  hof_size):
+    """Evolve one island for ngen generations in a worker.
+
+    Returns the packed island, the packed best individuals seen, the new
+    random state and the logbook of the epoch."""
+    random.setstate(rng_state)
+    population = unpack_individuals(island, length,
+                                    _worker['individual_type'])
+    hof = tools.HallOfFame(hof_size)
+
+    population, logbook = _worker['ea_simple'](
+        population, _worker['toolbox'], cxpb=cxpb, mutpb=mutpb, ngen=ngen,
+        halloffame=hof, verbose=False, cache=_worker['cache'],
+        repair_rate=_worker['repair_rate'])
+
+    return (pack_individuals(population), pack_individuals(hof),
+            random.getstate(), logbook)
+
+
+def migration_order(num_islands, topology, rng):
+    """Return the island that each island sends its migrants to."""
+    if topology == 'ring':
+        return list(range(1, num_islands)) + [0]
+    elif topology == 'random':
+        # A random permutation in which no island sends to itself.
+        while True:
+            order = list(range(num_islands))
+            rng.shuffle(order)
+            if num_islands < 2 or all(i != j for i, j in enumerate(order)):
+                return order
+    raise ValueError("Unknown topology: {}".format(topology))
+
+
+def migrate(islands, migrants, order):
+    """Replace the worst individuals of each island with copies of the
+    best of the island that sends to it (see migration_order)."""
+    emigrants = [tools.selBest(island, migrants) for island in islands]
+    for source, dest in enumerate(order):
+        island = islands[dest]
+        worst = sorted(range(len(island)),
+                       key=lambda i: island[i].fitness)[:migrants]
+        for i, ind in zip(worst, emigrants[source]):
+            island[i] = deepcopy(ind)
+
+
+def run_islands(population, individual_type, num_islands, ngen, cxpb, mutpb,
+                halloffame, evaluator, genome, interval=25, migrants=5,
+                topology='ring', cache_size=0, stop=None, verbose=True,
+                repair_rate=0., repair_moves=20):
+    """Evolve population as num_islands islands for ngen generations.
+
+    The islands run in a pool of worker processes, exchanging migrants
+    every interval generations. halloffame is updated after each epoch.
+    Returns the final islands."""
+    length = len(population[0])
+    islands = [population[i::num_islands] for i in range(num_islands)]
+
+    # Each island has its own random stream, seeded from ours, so a run
+    # is repeatable.
+    rng = random.Random(random.random())
+    rng_states = [random.Random(rng.random()).getstate()
+                  for _ in islands]
+
+    logbook = tools.Logbook()
+    logbook.header = ['gen', 'island', 'nevals', 'best']
+
+    with ProcessPoolExecutor(
+            max_workers=num_islands, initializer=init_worker,
+            initargs=(evaluator, genome, cache_size, repair_rate,
+                      repair_moves)) as executor:
+        gen = 0
+        while gen < ngen:
+            epoch = min(interval, ngen - gen)
+            futures = [executor.submit(evolve_island,
+                                       pack_individuals(island), length,
+                                       rng_state, epoch, cxpb, mutpb,
+                                       halloffame.maxsize)
+                       for island, rng_state in zip(islands, rng_states)]
+
+            results = [_.result() for _ in futures]
+            gen += epoch
+
+            islands = []
+            rng_states = []
+            for i, (island, best, rng_state, island_log) in enumerate(
+                    results):
+                islands.append(unpack_individuals(island, length,
+                                                  individual_type))
+                rng_states.append(rng_state)
+                halloffame.update(unpack_individuals(best, length,
+                                                     individual_type))
+                logbook.record(
+                    gen=gen, island=i,
+                    nevals=sum(island_log.select('nevals')),
+                    best=tools.selBest(islands[-1], 1)[0].fitness.values)
+                if verbose:
+                    print(logbook.stream)
+
+            if stop is not None:
+                reason = stop(gen, halloffame[0])
+                if reason:
+                    log.info("Stopping after generation {}: {}".format(
+                        gen, reason))
+                    break
+
+            if gen < ngen and num_islands > 1:
+                migrate(islands, migrants,
+                        migration_order(num_islands, topology, rng))
+
+    return islands, logbook
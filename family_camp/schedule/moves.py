@@ -0,0 +1,140 @@
+# coding: utf-8
+"""Family moves for the local searches.
+
+A move takes the members of a family out of every session of an activity
+and then (unless the target is None) puts the members that asked for the
+activity into the target session:
+
+    (group id, activity id, target session id or None)
+
+So a family is never split by a move. Moves are made on a flat NumPy
+boolean genome and scored by updating a DeltaEvaluator's PartialScores
+for just the slots that change.
+"""
+import numpy
+
+
+def weigh(values, weights):
+    """Return the weighted values, which compare the way DEAP compares
+    fitnesses (bigger is better)."""
+    return tuple(v * w for v, w in zip(values, weights))
+
+
+def energy(values):
+    """Return the energy (lower is better) of the (fitness, goodness,
+    bestness) values for the single trajectory searches: the number of
+    violations plus the fraction of the other activities that are not
+    met."""
+    fitness, goodness = values[:2]
+    return 1. / fitness + (1. - 1. / (100. * goodness))
+
+
+class FamilyMoves:
+
+    def __init__(self, evaluator, index, weights):
+        self.evaluator = evaluator
+        self.index = index
+        self.weights = weights
+
+        self.num_campers = index.num_campers
+        # activity id => array of its session ids.
+        self.sessions_of = {a: numpy.array(ids, dtype=numpy.int64)
+                            for a, ids in index.activity_sessions.items()}
+        # (group id, activity id) => the slots of the family's campers in
+        # the sessions of the activity, and which of the campers asked for
+        # it. Filled in as moves are made.
+        self.blocks = {}
+
+    def matrix(self, genome):
+        """The sessions x campers view of a flat genome."""
+        return genome.reshape(self.index.num_sessions, self.num_campers)
+
+    def targets(self, activity):
+        """The sessions a family can be moved to for activity, or None to
+        drop the activity."""
+        return self.index.activity_sessions[activity] + [None]
+
+    def block(self, group, activity):
+        key = (group, activity)
+        if key not in self.blocks:
+            members = sorted(self.index.group_campers[group])
+            wanted = set(self.index.family_activity_campers.get(key, []))
+            self.blocks[key] = (
+                self.sessions_of[activity][:, None] * self.num_campers +
+                numpy.array(members, dtype=numpy.int64),
+                numpy.array([c in wanted for c in members], dtype=bool))
+        return self.blocks[key]
+
+    def flips(self, genome, group, activity, target):
+        """Return the slots that change if the move is made.
+
+        Only the slots of the family's campers in the sessions of the
+        activity can change, so only those are looked at."""
+        slots, wanted = self.block(group, activity)
+        changed = genome[slots]
+        if target is not None:
+            changed[self.sessions_of[activity] == target] ^= wanted
+        return slots[changed]
+
+    def score(self, genome, scores, flips):
+        """Make the move (flip the slots in genome) and return the updated
+        copy of scores and its weighted values."""
+        genome[flips] = ~genome[flips]
+        scores = scores.copy()
+        self.evaluator.apply_flips(scores, genome, flips)
+        return scores, weigh(self.evaluator.values(scores), self.weights)
+
+    @staticmethod
+    def undo(genome, flips):
+        genome[flips] = ~genome[flips]
+
+    def problems(self, genome, scores):
+        """Return the (group id, activity id) pairs involved in the
+        current violations, most likely to help first."""
+        index = self.index
+        x = self.matrix(genome)
+        pairs = []
+
+        # Campers with clashes, missing priorities, unwanted activities or
+        # duplicates.
+        for c in numpy.flatnonzero((scores.camper_penalty > 0) |
+                                   (scores.camper_clash > 0)).tolist():
+            group = index.camper_group[c]
+            doing = numpy.flatnonzero(x[:, c]).tolist()
+            activities = [index.session_activity[s] for s in doing]
+            done = set(activities)
+
+            for a in index.camper_priorities[c] - done:
+                pairs.append((group, a))
+            for a in done - index.camper_wanted[c]:
+                pairs.append((group, a))
+            for a in done:
+                if activities.count(a) > 1:
+                    pairs.append((group, a))
+            for s in doing:
+                if any(x[o, c] for o in index.overlaps[s]):
+                    pairs.append((group, index.session_activity[s]))
+
+        # Families split across overlapping sessions.
+        for g in numpy.flatnonzero(scores.family_split > 0).tolist():
+            present = numpy.flatnonzero(scores.group_count[:, g] > 0).tolist()
+            for s in present:
+                if any(scores.group_count[o, g] for o in index.overlaps[s]):
+                    pairs.append((g, index.session_activity[s]))
+
+        # Sessions over their limit, and families that want the activity
+        # but are not doing it, who could fill sessions that are under
+        # their minimum.
+        in_session = scores.in_session
+        for s in numpy.flatnonzero(in_session > index.session_limit).tolist():
+            a = index.session_activity[s]
+            for g in numpy.flatnonzero(scores.group_count[s] > 0).tolist():
+                pairs.append((g, a))
+        for s in numpy.flatnonzero(in_session < index.session_min).tolist():
+            a = index.session_activity[s]
+            doing = scores.group_count[self.sessions_of[a]].sum(axis=0)
+            for g in numpy.flatnonzero(doing == 0).tolist():
+                if (g, a) in index.family_activity_campers:
+                    pairs.append((g, a))
+
+        return list(dict.fromkeys(pairs))
@@ -0,0 +1,199 @@
+# coding: utf-8
+"""NumPy implementation of the timetable evaluation.
+
+The genome is a flat list of True/False values, one for each
+(session, camper) slot. Here it is reshaped into a sessions x campers
+matrix and all of the violation counts are calculated with a handful of
+matrix operations rather than by walking SessionInst objects.
+
+The numbers returned are identical to those from deep.evaluate.
+"""
+import numpy
+
+from .deep import Individual
+from .bitgenome import BitGenome
+
+
+class NumpyEvaluator:
+    """Evaluate individuals for a fixed set of campers and sessions.
+
+    All of the static information about the problem is converted into
+    arrays once, when the evaluator is created. The evaluator is picklable
+    so that it can be registered as toolbox.evaluate and sent to the
+    workers."""
+
+    # The problem arrays, see from_arrays.
+    ARRAYS = ('overlaps', 'session_activity', 'camper_group', 'priorities',
+              'others', 'wanted', 'num_others', 'limits', 'mins')
+
+    def __init__(self, campers, sessions, index=None):
+        if index is None:
+            index = Individual.problem_index(campers, sessions)
+
+        self.num_campers = len(campers)
+        self.num_sessions = len(sessions)
+
+        activities = index.activities
+        act_idx = index.activity_id
+
+        # sessions x sessions: 1 where two (different) sessions overlap.
+        self.overlaps = numpy.zeros((len(sessions), len(sessions)),
+                                    dtype=numpy.float32)
+        for i, others in enumerate(index.overlaps):
+            self.overlaps[i, others] = 1
+
+        # sessions x activities: the activity that each session runs.
+        self.session_activity = numpy.zeros(
+            (len(sessions), len(activities)), dtype=numpy.float32)
+        self.session_activity[range(len(sessions)),
+                              index.session_activity] = 1
+
+        # campers x groups: the family that each camper belongs to.
+        self.camper_group = numpy.zeros(
+            (len(campers), len(index.groups)), dtype=numpy.float32)
+        self.camper_group[range(len(campers)), index.camper_group] = 1
+
+        # campers x activities masks of what has been asked for.
+        self.priorities = numpy.zeros((len(campers), len(activities)),
+                                      dtype=bool)
+        self.others = numpy.zeros((len(campers), len(activities)),
+                                  dtype=bool)
+        for i, c in enumerate(campers):
+            for a in c.priorities:
+                self.priorities[i, act_idx[a]] = True
+            for a in c.others:
+                self.others[i, act_idx[a]] = True
+        self.wanted = self.priorities | self.others
+
+        # Note: this is the length of the list, not of the set, to match
+        # Individual.goodness.
+        self.num_others = numpy.array([len(c.others) for c in campers],
+                                      dtype=numpy.float64)
+
+        self.limits = numpy.array([s.activity.limit for s in sessions],
+                                  dtype=numpy.int64)
+        self.mins = numpy.array([s.activity.min for s in sessions],
+                                dtype=numpy.int64)
+
+    @classmethod
+    def from_arrays(cls, num_campers, num_sessions, arrays):
+        """Return an evaluator built from existing problem arrays (a dict
+        with the ARRAYS names as keys), e.g. views of shared memory."""
+        evaluator = cls.__new__(cls)
+        evaluator.num_campers = num_campers
+        evaluator.num_sessions = num_sessions
+        for name in cls.ARRAYS:
+            setattr(evaluator, name, arrays[name])
+        return evaluator
+
+    def bits(self, individual):
+        """Return the individual as a sessions x campers boolean matrix."""
+        if isinstance(individual, numpy.ndarray):
+            bits = individual
+        elif isinstance(individual, BitGenome):
+            bits = individual.as_array()
+        else:
+            bits = numpy.fromiter(
+                individual, dtype=bool,
+                count=self.num_sessions * self.num_campers)
+        return bits.reshape(self.num_sessions, self.num_campers)
+
+    def matrix(self, individual):
+        """Return the individual as a sessions x campers float matrix."""
+        return self.bits(individual).astype(numpy.float32)
+
+    def violations(self, x):
+        """Return the violation count for the sessions x campers matrix x,
+        along with the session sizes and the campers x activities mask
+        that the other measures are built from.
+
+        x can have leading dimensions (e.g. population x sessions x
+        campers), in which case there is a count for each matrix.
+
+        The count is the same value as Individual.fitness()."""
+        count = 1
+
+        # Number of times a camper is in two sessions that overlap. Each
+        # clashing pair is counted once from each side.
+        count += (x * (self.overlaps @ x)).sum(axis=(-2, -1))
+
+        # Number of times a family is split across overlapping sessions.
+        families = ((x @ self.camper_group) > 0).astype(numpy.float32)
+        count += (families * (self.overlaps @ families)).sum(axis=(-2, -1))
+
+        # Sessions over the limit and under the minimum.
+        in_session = x.sum(axis=-1).astype(numpy.int64)
+        count += numpy.maximum(in_session - self.limits, 0).sum(axis=-1)
+        count += numpy.maximum(self.mins - in_session, 0).sum(axis=-1)
+
+        # campers x activities: how many times each camper does each
+        # activity.
+        per_activity = x.swapaxes(-2, -1) @ self.session_activity
+        doing = per_activity > 0
+
+        count += (self.priorities & ~doing).sum(axis=(-2, -1))
+        count += (doing & ~self.wanted).sum(axis=(-2, -1))
+        count += numpy.maximum(per_activity - 1, 0).sum(axis=(-2, -1))
+
+        return count.astype(numpy.int64), in_session, doing
+
+    def percentage_met(self, doing):
+        """Return the goodness value for the campers x activities mask."""
+        met = numpy.where(
+            self.num_others == 0, 1,
+            (self.others & doing).sum(axis=-1) /
+            numpy.where(self.num_others == 0, 1, self.num_others))
+
+        # cumsum adds the values in order, so we get exactly the same
+        # rounding as the loop in Individual.goodness.
+        if self.num_campers:
+            total = numpy.cumsum(met, axis=-1)[..., -1]
+        else:
+            total = numpy.zeros(met.shape[:-1])
+        percentage_met = (total / self.num_campers) * 100
+
+        return numpy.where(percentage_met != 0, percentage_met, 1)
+
+    @staticmethod
+    def variance(in_session):
+        """Population variance of the session sizes.
+
+        Computed from exact integer sums, which rounds the same way as
+        statistics.pvariance does for integer data."""
+        n = in_session.shape[-1]
+        total = in_session.sum(axis=-1)
+        squares = (in_session * in_session).sum(axis=-1)
+        return (n * squares - total * total) / (n * n)
+
+    def objectives(self, x):
+        """Return arrays of the fitness, goodness and bestness values for
+        x (see violations)."""
+        count, in_session, doing = self.violations(x)
+        variance = self.variance(in_session)
+
+        fitness = 1. / count
+        goodness = 1. / self.percentage_met(doing)
+        bestness = numpy.divide(1., variance,
+                                out=numpy.zeros_like(variance),
+                                where=variance != 0)
+        return fitness, goodness, bestness
+
+    def evaluate_population(self, individuals, chunk_size=256):
+        """Return a (fitness, goodness, bestness) tuple for each of the
+        individuals.
+
+        The individuals are stacked into a population x sessions x
+        campers array and scored together, chunk_size at a time to keep
+        the memory use down."""
+        values = []
+        for start in range(0, len(individuals), chunk_size):
+            chunk = individuals[start:start + chunk_size]
+            x = numpy.stack([self.bits(_) for _ in chunk]).astype(
+                numpy.float32)
+            values.extend(zip(*[_.tolist() for _ in self.objectives(x)]))
+        return values
+
+    def __call__(self, individual):
+        fitness, goodness, bestness = self.objectives(
+            self.matrix(individual))
+        return float(fitness), float(goodness), float(bestness)
@@ -0,0 +1,98 @@
+# coding: utf-8
+"""Performance instrumentation of the generation loop.
+
+ea_simple times each phase of a generation with a PhaseTimer:
+
+  select     - toolbox.select
+  vary       - varAnd (mate and mutate)
+  repair     - repair_offspring, if it is on
+  evaluate   - evaluate_invalid, including the cache lookups
+  map        - the part of evaluate spent in toolbox.map (or
+               evaluate_population), so the evaluations themselves and,
+               with a process pool, sending the individuals to the workers
+               and the results back
+  halloffame - updating the hall of fame
+  stats      - the logbook statistics
+  checkpoint - writing checkpoints
+
+and, if it is given a PerfLog, writes one JSON line per generation with
+the phase times, the evaluations per second, the cache hit rate and the
+memory used by the genomes. The first line of each run describes the
+machine and the run's settings, so that files from different runs and
+machines can be compared.
+"""
+import os
+import sys
+import json
+import time
+import platform
+from contextlib import contextmanager
+
+
+class PhaseTimer:
+    """Add up the wall-clock time spent in named phases."""
+
+    def __init__(self):
+        self.times = {}
+
+    @contextmanager
+    def __call__(self, phase):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.times[phase] = (self.times.get(phase, 0.0) +
+                                 time.perf_counter() - start)
+
+    def reset(self):
+        """Return the times so far and start again."""
+        times, self.times = self.times, {}
+        return times
+
+
+def population_bytes(population):
+    """Return the memory used by the genomes of population, in bytes."""
+    return sum(sys.getsizeof(ind) for ind in population)
+
+
+class PerfLog:
+    """Write performance records to path as JSON lines.
+
+    The file is appended to (a resumed run carries on in the same file)
+    and flushed after every line, so it can be followed while the run is
+    going."""
+
+    def __init__(self, path, **settings):
+        self.path = path
+        self.file = open(path, 'a')
+        self.started = time.perf_counter()
+        self.write(event='start', time=time.time(), host=platform.node(),
+                   python=platform.python_version(), cpus=os.cpu_count(),
+                   **settings)
+
+    def write(self, **record):
+        self.file.write(json.dumps(record) + '\n')
+        self.file.flush()
+
+    def record(self, gen, nevals, phases, population, hits=None,
+               misses=None):
+        """Write the record for generation gen."""
+        record = {
+            'event': 'generation',
+            'gen': gen,
+            'elapsed': time.perf_counter() - self.started,
+            'nevals': nevals,
+            'phases': phases,
+            'total': sum(t for phase, t in phases.items() if phase != 'map'),
+            'evals_per_sec': (nevals / phases['evaluate']
+                              if phases.get('evaluate') else None),
+            'population_bytes': population_bytes(population),
+        }
+        if hits is not None:
+            record.update(hits=hits, misses=misses,
+                          hit_rate=(hits / (hits + misses)
+                                    if hits + misses else 0.0))
+        self.write(**record)
+
+    def close(self):
+        self.file.close()
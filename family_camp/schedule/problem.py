@@ -0,0 +1,170 @@
+# coding: utf-8
+"""Integer indexes for a loaded problem.
+
+The genome is a flat list of slots, one for each (session, camper) pair,
+laid out session by session:
+
+    slot = session_id * num_campers + camper_id
+
+ProblemIndex is built once (by get_source_data) and gives O(1) lookups
+from campers, sessions, activities and groups to their ids and slots,
+instead of calling list.index() in the hot paths. It also holds the
+session overlap map, which only depends on the sessions and so is worked
+out once per problem rather than for every Individual.
+"""
+from bisect import bisect_right
+
+import numpy
+
+
+def sweep_overlaps(sessions):
+    """Return, for each session, the sorted ids of the other sessions that
+    overlap it.
+
+    Sessions are closed intervals (see deep.sessions_overlap). Once they
+    are sorted by start time each session only has to be compared with
+    the sessions that start before it ends, rather than with every other
+    session."""
+    order = sorted(range(len(sessions)), key=lambda i: sessions[i].start)
+    overlaps = [[] for _ in sessions]
+
+    for pos, i in enumerate(order):
+        end = sessions[i].end
+        for j in order[pos + 1:]:
+            if sessions[j].start > end:
+                break
+            overlaps[i].append(j)
+            overlaps[j].append(i)
+
+    return [sorted(_) for _ in overlaps]
+
+
+def bit_indices(bits):
+    """Yield the positions of the bits that are set in the integer bits,
+    lowest first."""
+    while bits:
+        low = bits & -bits
+        yield low.bit_length() - 1
+        bits ^= low
+
+
+class ProblemIndex:
+
+    def __init__(self, campers, sessions):
+        self.campers = campers
+        self.sessions = sessions
+        self.num_campers = len(campers)
+        self.num_sessions = len(sessions)
+
+        self.camper_id = {c: i for i, c in enumerate(campers)}
+        self.session_id = {s: i for i, s in enumerate(sessions)}
+
+        # Every activity that is mentioned anywhere, those with sessions
+        # first. Priorities can refer to activities that have no sessions.
+        self.activities = []
+        for act in ([s.activity for s in sessions] +
+                    [a for c in campers for a in c.priorities + c.others]):
+            if act not in self.activities:
+                self.activities.append(act)
+        self.activity_id = {a: i for i, a in enumerate(self.activities)}
+
+        self.groups = sorted(set(c.group for c in campers))
+        self.group_id = {g: i for i, g in enumerate(self.groups)}
+
+        self.camper_group = [self.group_id[c.group] for c in campers]
+        self.session_activity = [self.activity_id[s.activity]
+                                 for s in sessions]
+
+        # Offset of the first slot of each session.
+        self.session_offset = [i * self.num_campers
+                               for i in range(self.num_sessions)]
+
+        # activity id => [session ids] and the matching slot offsets.
+        self.activity_sessions = {a: [] for a in range(len(self.activities))}
+        for s, a in enumerate(self.session_activity):
+            self.activity_sessions[a].append(s)
+        self.activity_offsets = {
+            a: [self.session_offset[s] for s in ids]
+            for a, ids in self.activity_sessions.items()}
+
+        # group id => [camper ids], i.e. the group's offsets within a
+        # session.
+        self.group_campers = [[] for _ in self.groups]
+        for c, g in enumerate(self.camper_group):
+            self.group_campers[g].append(c)
+
+        # Each camper's requests as sets of activity ids. num_others is
+        # the length of the list (not the set), as used by the goodness.
+        self.camper_priorities = [
+            frozenset(self.activity_id[a] for a in c.priorities)
+            for c in campers]
+        self.camper_others = [
+            frozenset(self.activity_id[a] for a in c.others)
+            for c in campers]
+        self.camper_wanted = [p | o for p, o in zip(self.camper_priorities,
+                                                    self.camper_others)]
+        self.camper_num_others = [len(c.others) for c in campers]
+
+        # (group id, activity id) => [camper ids] of the members of the
+        # family that asked for the activity.
+        self.family_activity_campers = {}
+        for c, camper in enumerate(campers):
+            for act in set(camper.priorities + camper.others):
+                self.family_activity_campers.setdefault(
+                    (self.camper_group[c], self.activity_id[act]),
+                    []).append(c)
+
+        # Session size limits, as arrays for vectorised checks.
+        self.session_limit = numpy.array(
+            [s.activity.limit for s in sessions], dtype=numpy.int64)
+        self.session_min = numpy.array(
+            [s.activity.min for s in sessions], dtype=numpy.int64)
+
+        # group id => every slot that belongs to the family, across all of
+        # the sessions.
+        session_offsets = numpy.array(self.session_offset, dtype=numpy.int64)
+        self.family_slots = [
+            (session_offsets[:, None] +
+             numpy.array(members, dtype=numpy.int64)[None, :]).ravel()
+            for members in self.group_campers]
+
+        # session id => [ids of the sessions that overlap it], and the
+        # same thing as a Session => [Session] map.
+        self.overlaps = sweep_overlaps(sessions)
+        self.overlapping_sessions = {
+            session: [sessions[_] for _ in self.overlaps[i]]
+            for i, session in enumerate(sessions)}
+
+        # Session ids sorted by start time, for sessions_overlapping.
+        self.by_start = sorted(range(self.num_sessions),
+                               key=lambda i: sessions[i].start)
+        self.starts = [sessions[i].start for i in self.by_start]
+
+        # Lookups used when reading timetables from csv files.
+        self.camper_by_name = {(c.group.strip(), c.name.strip()): c
+                               for c in campers}
+        self.session_by_start = {(s.label.strip(), s.start): s
+                                 for s in sessions}
+
+    def slot(self, session, camper):
+        """Return the genome index of the (session, camper) slot."""
+        return (self.session_id[session] * self.num_campers +
+                self.camper_id[camper])
+
+    def family_campers(self, group, activity):
+        """Return the ids of the members of group that want activity."""
+        return self.family_activity_campers.get(
+            (self.group_id[group], self.activity_id[activity]), [])
+
+    def sessions_overlapping(self, start, end):
+        """Return the sessions that overlap the period start to end, in
+        session order."""
+        ids = [i for i in self.by_start[:bisect_right(self.starts, end)]
+               if self.sessions[i].end >= start]
+        return [self.sessions[i] for i in sorted(ids)]
+
+    def find_camper(self, group, name):
+        return self.camper_by_name.get((group.strip(), name.strip()))
+
+    def find_session(self, label, start):
+        return self.session_by_start.get((label.strip(), start))
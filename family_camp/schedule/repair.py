@@ -0,0 +1,76 @@
+# coding: utf-8
+"""Hill climbing repair of offspring (a memetic step for the GA).
+
+Repair looks at the families and activities involved in the violations of
+an individual (see FamilyMoves.problems) and makes the first family move
+that improves the fitness, repeating until no move improves it or
+max_moves have been made (with max_moves=None, until no move improves
+it). It only uses the genome, so the same
+individual is always repaired the same way.
+
+The repaired individual's fitness is set from the incremental scores, so
+it does not need to be evaluated again.
+"""
+import random
+
+from .deep import genome_array, set_genome
+from .delta import DeltaEvaluator
+from .moves import FamilyMoves, weigh
+
+
+class Repair:
+
+    def __init__(self, campers, sessions, index, weights, max_moves=20):
+        self.evaluator = DeltaEvaluator(campers, sessions, index)
+        self.moves = FamilyMoves(self.evaluator, index, weights)
+        self.max_moves = max_moves
+
+    def climb(self, genome, scores):
+        """Hill climb from genome (a flat NumPy boolean array, changed in
+        place) and its scores. Returns the final scores and the number of
+        moves made."""
+        moves = self.moves
+        best = weigh(self.evaluator.values(scores), moves.weights)
+
+        made = 0
+        while self.max_moves is None or made < self.max_moves:
+            improved = False
+            for group, activity in moves.problems(genome, scores):
+                for target in moves.targets(activity):
+                    flips = moves.flips(genome, group, activity, target)
+                    if not len(flips):
+                        continue
+                    new_scores, value = moves.score(genome, scores, flips)
+                    if value > best:
+                        scores, best = new_scores, value
+                        improved = True
+                        break
+                    moves.undo(genome, flips)
+                if improved:
+                    break
+            if not improved:
+                break
+            made += 1
+
+        return scores, made
+
+    def __call__(self, individual):
+        """Repair individual in place."""
+        genome = genome_array(individual).copy()
+        scores, made = self.climb(genome, self.evaluator.full_scores(genome))
+
+        if made:
+            set_genome(individual, genome)
+            if getattr(individual, 'partial_scores', None) is not None:
+                individual.partial_scores = scores
+                individual.flipped_slots = []
+        individual.fitness.values = self.evaluator.values(scores)
+        return individual,
+
+
+def repair_offspring(offspring, toolbox_, rate):
+    """Repair a random fraction rate of the offspring that have changed
+    (those without a valid fitness)."""
+    for ind in offspring:
+        if not ind.fitness.valid and random.random() < rate:
+            toolbox_.repair(ind)
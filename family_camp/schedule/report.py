@@ -0,0 +1,274 @@
+# coding: utf-8
+"""A structured report of the violations in a timetable.
+
+Individual.fitness() and goodness() only count; when we want to know what
+is actually wrong with a timetable (print_individual, check_schedule and
+the hall of fame dumps) a ViolationReport is built for it instead. The
+report is a list of typed records, one for each thing that adds to the
+fitness count, which can be written out as text, JSON or CSV. The JSON
+and CSV forms only hold names and times, so the violation sets of two
+runs can be compared with diff.
+"""
+import csv
+import io
+import json
+from dataclasses import dataclass, asdict, fields
+from typing import ClassVar
+
+from .problem import bit_indices
+
+
+def session_key(session):
+    return "{} {}".format(session.label,
+                          session.start.strftime("%Y-%m-%d %H:%M"))
+
+
+@dataclass(frozen=True)
+class Violation:
+    kind: ClassVar[str] = ""
+    heading: ClassVar[str] = ""
+
+    @property
+    def penalty(self):
+        """The amount this record adds to Individual.fitness()."""
+        return 1
+
+    def as_dict(self):
+        return dict(kind=self.kind, **asdict(self))
+
+
+@dataclass(frozen=True)
+class Clash(Violation):
+    """A camper is in two sessions that overlap.
+
+    As in the fitness, there is a record for each side of the pair."""
+    kind: ClassVar[str] = "clash"
+    heading: ClassVar[str] = "Campers in two sessions at the same time"
+
+    group: str
+    camper: str
+    session: str
+    other: str
+
+    def __str__(self):
+        return "{}/{} is in {} and {}".format(
+            self.group, self.camper, self.session, self.other)
+
+
+@dataclass(frozen=True)
+class SplitFamily(Violation):
+    """A family has members in two sessions that overlap."""
+    kind: ClassVar[str] = "split_family"
+    heading: ClassVar[str] = "Families split across two sessions"
+
+    group: str
+    session: str
+    other: str
+
+    def __str__(self):
+        return "{} is in {} and {}".format(
+            self.group, self.session, self.other)
+
+
+@dataclass(frozen=True)
+class OverLimit(Violation):
+    kind: ClassVar[str] = "over_limit"
+    heading: ClassVar[str] = "Sessions exceeding size limit"
+
+    session: str
+    size: int
+    limit: int
+
+    @property
+    def penalty(self):
+        return self.size - self.limit
+
+    def __str__(self):
+        return "{} Exceeded limit: {} > {}".format(
+            self.session, self.size, self.limit)
+
+
+@dataclass(frozen=True)
+class UnderMinimum(Violation):
+    kind: ClassVar[str] = "under_minimum"
+    heading: ClassVar[str] = "Sessions under session min"
+
+    session: str
+    size: int
+    minimum: int
+
+    @property
+    def penalty(self):
+        return self.minimum - self.size
+
+    def __str__(self):
+        return "{} Below min: {} < {}".format(
+            self.session, self.size, self.minimum)
+
+
+@dataclass(frozen=True)
+class MissingPriority(Violation):
+    kind: ClassVar[str] = "missing_priority"
+    heading: ClassVar[str] = "Campers missing a priority"
+
+    group: str
+    camper: str
+    activity: str
+
+    def __str__(self):
+        return "{}/{} missing {}".format(self.group, self.camper,
+                                         self.activity)
+
+
+@dataclass(frozen=True)
+class Unwanted(Violation):
+    kind: ClassVar[str] = "unwanted"
+    heading: ClassVar[str] = "Campers doing activities they did not ask for"
+
+    group: str
+    camper: str
+    activity: str
+
+    def __str__(self):
+        return "{}/{} unwanted {}".format(self.group, self.camper,
+                                          self.activity)
+
+
+@dataclass(frozen=True)
+class Duplicate(Violation):
+    kind: ClassVar[str] = "duplicate"
+    heading: ClassVar[str] = "Campers doing an activity more than once"
+
+    group: str
+    camper: str
+    activity: str
+    times: int
+
+    @property
+    def penalty(self):
+        return self.times - 1
+
+    def __str__(self):
+        return "{}/{} doing {} {} times".format(
+            self.group, self.camper, self.activity, self.times)
+
+
+@dataclass(frozen=True)
+class OtherNotMet(Violation):
+    """One of a camper's other activities is not in the timetable.
+
+    This only affects the goodness, so it does not add to the fitness."""
+    kind: ClassVar[str] = "other_not_met"
+    heading: ClassVar[str] = "Others not met"
+
+    group: str
+    camper: str
+    activity: str
+
+    @property
+    def penalty(self):
+        return 0
+
+    def __str__(self):
+        return "{}/{} missing {}".format(self.group, self.camper,
+                                         self.activity)
+
+
+KINDS = [Clash, SplitFamily, OverLimit, UnderMinimum, MissingPriority,
+         Unwanted, Duplicate, OtherNotMet]
+
+# The union of the fields of all of the kinds, for the CSV export.
+COLUMNS = ['kind'] + list(dict.fromkeys(
+    f.name for kind in KINDS for f in fields(kind)))
+
+
+class ViolationReport:
+    """The violations in an Individual.
+
+    The records are only worked out the first time they are asked for."""
+
+    def __init__(self, individual):
+        self.individual = individual
+        self._records = None
+
+    @property
+    def records(self):
+        if self._records is None:
+            self._records = list(self._build())
+        return self._records
+
+    def of_kind(self, kind):
+        return [_ for _ in self.records if isinstance(_, kind)]
+
+    def penalty(self):
+        """The total of the penalties, i.e. Individual.fitness() - 1."""
+        return sum(_.penalty for _ in self.records)
+
+    def _build(self):
+        ind = self.individual
+        session_map = ind.session_inst_map
+
+        for s in ind.session_inst:
+            overlapping = ind.overlapping_sessions_map[s.session]
+
+            for other in overlapping:
+                for i in bit_indices(s.camper_bits &
+                                     session_map[other].camper_bits):
+                    c = ind.campers[i]
+                    yield Clash(c.group, c.name, session_key(s.session),
+                                session_key(other))
+
+                for i in bit_indices(s.group_bits &
+                                     session_map[other].group_bits):
+                    yield SplitFamily(ind.index.groups[i],
+                                      session_key(s.session),
+                                      session_key(other))
+
+            activity = s.session.activity
+            if len(s.campers) > activity.limit:
+                yield OverLimit(session_key(s.session), len(s.campers),
+                                activity.limit)
+            if len(s.campers) < activity.min:
+                yield UnderMinimum(session_key(s.session), len(s.campers),
+                                   activity.min)
+
+        for c, insts in ind.export_by_camper().items():
+            activities = [s.session.activity for s in insts]
+            doing = set(activities)
+
+            for a in sorted(set(c.priorities) - doing, key=lambda a: a.name):
+                yield MissingPriority(c.group, c.name, a.name)
+
+            for a in sorted(doing - (set(c.priorities) | set(c.others)),
+                            key=lambda a: a.name):
+                yield Unwanted(c.group, c.name, a.name)
+
+            for a in sorted(doing, key=lambda a: a.name):
+                times = activities.count(a)
+                if times > 1:
+                    yield Duplicate(c.group, c.name, a.name, times)
+
+            for a in sorted(set(c.others) - doing, key=lambda a: a.name):
+                yield OtherNotMet(c.group, c.name, a.name)
+
+    def summary(self):
+        """Return the records as text, grouped by kind."""
+        out = []
+        for kind in KINDS:
+            records = self.of_kind(kind)
+            if records:
+                out.append("\n== {} ({}) ==".format(kind.heading,
+                                                    len(records)))
+                out.extend(str(_) for _ in records)
+        return "\n".join(out) + "\n"
+
+    def to_json(self):
+        return json.dumps([_.as_dict() for _ in self.records], indent=1)
+
+    def to_csv(self):
+        out = io.StringIO()
+        writer = csv.DictWriter(out, fieldnames=COLUMNS, restval='')
+        writer.writeheader()
+        for record in self.records:
+            writer.writerow(record.as_dict())
+        return out.getvalue()
@@ -0,0 +1,110 @@
+# coding: utf-8
+"""Seeding of the initial population.
+
+Rather than mutating copies of a single seed timetable, the population is
+built from a number of independent seeds:
+
+  greedy   - random_greedy_seed, each with its own random seed. They are
+             made through toolbox.map, so with the process or scoop
+             backends they are spread across the workers.
+  imported - timetables read from csv files, and the greedy.py
+             timetable.
+
+and the rest of the population is filled with mutated copies of the
+seeds, taken in turn. mean_hamming_distance measures how diverse the
+result is.
+"""
+import random
+from functools import partial
+
+import numpy
+
+from .deep import genome_array
+
+
+def random_greedy_seed(index, seed):
+    """Return a genome (a list of bools) built greedily in a random order.
+
+    The sessions are visited in a random order and each one is filled
+    with the families that asked for its activity, those with it as a
+    priority first, while there is room. A family is only added if it is
+    not already doing the activity or something in an overlapping session
+    (whichever of its members that is), so it is never split, and the
+    members that asked for the activity are always added together."""
+    rng = random.Random(seed)
+    num_campers = index.num_campers
+    genome = [False] * (index.num_sessions * num_campers)
+
+    # activity id => [(has priority, group id, [camper ids])]
+    families = {}
+    for (group, activity), members in index.family_activity_campers.items():
+        priority = any(activity in index.camper_priorities[c]
+                       for c in members)
+        families.setdefault(activity, []).append((priority, group, members))
+
+    # group id => activity ids and session ids the family is doing.
+    doing = [set() for _ in index.group_campers]
+    busy = [set() for _ in index.group_campers]
+
+    order = list(range(index.num_sessions))
+    rng.shuffle(order)
+    for s in order:
+        activity = index.session_activity[s]
+        limit = index.session_limit[s]
+        overlaps = index.overlaps[s]
+
+        candidates = list(families.get(activity, []))
+        rng.shuffle(candidates)
+        candidates.sort(key=lambda _: not _[0])
+
+        count = 0
+        for _, group, members in candidates:
+            if count + len(members) > limit:
+                continue
+            if (activity in doing[group] or
+                    any(o in busy[group] for o in overlaps)):
+                continue
+            for c in members:
+                genome[s * num_campers + c] = True
+            doing[group].add(activity)
+            busy[group].add(s)
+            count += len(members)
+
+    return genome
+
+
+def seed_population(toolbox_, individual_type, n, index, num_seeds,
+                    imported=()):
+    """Return a population of n individual_type individuals.
+
+    The population starts with the imported genomes and num_seeds
+    random_greedy_seed genomes, and is filled up with mutated copies of
+    them."""
+    seeds = [individual_type(_) for _ in imported]
+    seeds += [individual_type(_) for _ in toolbox_.map(
+        partial(random_greedy_seed, index),
+        [random.random() for _ in range(num_seeds)])]
+    if not seeds:
+        raise ValueError("There are no seed timetables")
+
+    population = seeds[:n]
+    while len(population) < n:
+        population.append(
+            toolbox_.mutate(seeds[len(population) % len(seeds)])[0])
+    return population
+
+
+def mean_hamming_distance(population):
+    """Return the mean number of slots that differ between two members of
+    population, over all of the pairs.
+
+    Worked out from the number of individuals that have each slot set,
+    as a slot set in k of n individuals differs in k * (n - k) pairs."""
+    n = len(population)
+    if n < 2:
+        return 0.0
+
+    counts = numpy.zeros(len(population[0]), dtype=numpy.int64)
+    for individual in population:
+        counts += genome_array(individual)
+    return float((counts * (n - counts)).sum() / (n * (n - 1) / 2))
@@ -0,0 +1,192 @@
+# coding: utf-8
+"""Evaluation in worker processes without pickling the population.
+
+SharedMemoryBackend keeps three multiprocessing.shared_memory blocks:
+
+  problem     - the NumpyEvaluator arrays, written once.
+  population  - one row of packed genome bits per individual.
+  results     - one (fitness, goodness, bestness) row per individual.
+
+Each generation the genomes are packed into the population block and the
+workers are only sent the range of rows to score, which they read from
+the population block and write back to the results block.
+"""
+import os
+import logging
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing import shared_memory
+
+import numpy
+
+from .bitgenome import BitGenome
+from .backends import chunked
+from .numpy_fitness import NumpyEvaluator
+
+log = logging.getLogger(__name__)
+
+
+class SharedArray:
+    """A NumPy array in a block of shared memory.
+
+    Created with shape and dtype in the parent, or attached to by name
+    in a worker."""
+
+    def __init__(self, shape, dtype, name=None):
+        self.shape = tuple(shape)
+        self.dtype = numpy.dtype(dtype)
+        size = max(1, int(numpy.prod(self.shape)) * self.dtype.itemsize)
+        if name is None:
+            self.shm = shared_memory.SharedMemory(create=True, size=size)
+        else:
+            self.shm = shared_memory.SharedMemory(name=name)
+        self.array = numpy.ndarray(self.shape, dtype=self.dtype,
+                                   buffer=self.shm.buf)
+
+    @property
+    def spec(self):
+        """What a worker needs to attach to the array."""
+        return self.shape, self.dtype.str, self.shm.name
+
+    @classmethod
+    def attach(cls, spec):
+        shape, dtype, name = spec
+        return cls(shape, dtype, name)
+
+    def close(self):
+        del self.array
+        self.shm.close()
+
+    def unlink(self):
+        self.close()
+        self.shm.unlink()
+
+
+# Per worker state, set up by _init_worker and _attach.
+_worker = {}
+
+
+def _init_worker(num_campers, num_sessions, problem_specs):
+    problem = {name: SharedArray.attach(spec)
+               for name, spec in problem_specs.items()}
+    _worker['problem'] = problem
+    _worker['evaluator'] = NumpyEvaluator.from_arrays(
+        num_campers, num_sessions,
+        {name: _.array for name, _ in problem.items()})
+    _worker['blocks'] = {}
+
+
+def _attach(*specs):
+    """Return the worker's views of the shared arrays, attaching to them
+    the first time they are seen and letting go of any old ones (the
+    parent replaces the blocks when the population grows)."""
+    blocks = _worker['blocks']
+    names = [spec[2] for spec in specs]
+    for name in list(blocks):
+        if name not in names:
+            blocks.pop(name).close()
+    for name, spec in zip(names, specs):
+        if name not in blocks:
+            blocks[name] = SharedArray.attach(spec)
+    return [blocks[name].array for name in names]
+
+
+def _evaluate_rows(population_spec, results_spec, start, stop,
+                   chunk_size=256):
+    """Score the packed genomes in rows start to stop of the population
+    block and write the values into the same rows of the results
+    block."""
+    evaluator = _worker['evaluator']
+    population, results = _attach(population_spec, results_spec)
+    length = evaluator.num_sessions * evaluator.num_campers
+
+    for first in range(start, stop, chunk_size):
+        last = min(first + chunk_size, stop)
+        x = numpy.unpackbits(population[first:last], axis=1, count=length,
+                             bitorder='little').reshape(
+            last - first, evaluator.num_sessions,
+            evaluator.num_campers).astype(numpy.float32)
+        for column, values in enumerate(evaluator.objectives(x)):
+            results[first:last, column] = values
+    return stop - start
+
+
+class SharedMemoryBackend:
+    """Evaluate whole generations in a process pool through shared
+    memory.
+
+    Registered as toolbox.evaluate_population (see evaluate_invalid)."""
+
+    name = 'shared'
+
+    def __init__(self, evaluator, workers=None, chunks_per_worker=4):
+        if not isinstance(evaluator, NumpyEvaluator):
+            raise ValueError(
+                "The shared backend needs the numpy or batch evaluator")
+
+        self.workers = workers or os.cpu_count()
+        self.chunks_per_worker = chunks_per_worker
+        self.length = evaluator.num_sessions * evaluator.num_campers
+        self.row_bytes = (self.length + 7) // 8
+
+        self.problem = {}
+        for name in NumpyEvaluator.ARRAYS:
+            array = getattr(evaluator, name)
+            self.problem[name] = SharedArray(array.shape, array.dtype)
+            self.problem[name].array[...] = array
+
+        self.population = None
+        self.results = None
+
+        self.executor = ProcessPoolExecutor(
+            max_workers=self.workers, initializer=_init_worker,
+            initargs=(evaluator.num_campers, evaluator.num_sessions,
+                      {name: _.spec for name, _ in self.problem.items()}))
+
+    def _reserve(self, rows):
+        """Make sure the population and results blocks hold rows rows."""
+        if self.population is not None and self.population.shape[0] >= rows:
+            return
+        for block in (self.population, self.results):
+            if block is not None:
+                block.unlink()
+        self.population = SharedArray((rows, self.row_bytes), numpy.uint8)
+        self.results = SharedArray((rows, 3), numpy.float64)
+
+    def _pack(self, individual, row):
+        if isinstance(individual, BitGenome):
+            row[:] = individual.packed()
+        else:
+            row[:] = numpy.packbits(
+                numpy.fromiter(individual, dtype=bool, count=self.length),
+                bitorder='little')
+
+    def evaluate_population(self, individuals):
+        """Return a (fitness, goodness, bestness) tuple for each of the
+        individuals."""
+        if not individuals:
+            return []
+
+        self._reserve(len(individuals))
+        population = self.population.array
+        for row, individual in enumerate(individuals):
+            self._pack(individual, population[row])
+
+        ranges = [(_[0], _[-1] + 1) for _ in chunked(
+            range(len(individuals)), self.workers * self.chunks_per_worker)]
+        list(self.executor.map(
+            _evaluate_rows,
+            *zip(*[(self.population.spec, self.results.spec, start, stop)
+                   for start, stop in ranges])))
+
+        return [tuple(_) for _ in
+                self.results.array[:len(individuals)].tolist()]
+
+    def map(self, func, iterable):
+        return list(map(func, iterable))
+
+    def close(self):
+        self.executor.shutdown()
+        for block in [self.population, self.results] + list(
+                self.problem.values()):
+            if block is not None:
+                block.unlink()
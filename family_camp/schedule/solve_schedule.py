@@ -0,0 +1,234 @@
+# coding: utf-8
+"""Solve the timetable with the OR-Tools CP-SAT solver ("solve").
+
+The model has a boolean for each family and each session of an activity
+that the family asked for, meaning that the members of the family that
+asked for the activity are in the session. So families are never split.
+
+Hard constraints:
+
+  - the number of campers in a session is between its activity's
+    minimum and limit,
+  - a family does an activity at most once,
+  - a family is never in two overlapping sessions.
+
+The objective is to maximise the number of priorities met, and then the
+number of other activities met. Each priority is worth more than all of
+the other activities put together.
+
+Each improving solution is turned into the GA's genome and written to
+best.csv (and its violations to best_violations.csv) in the output
+directory as it is found (see SolutionDumper), so a good timetable can
+be used before a long solve has finished. The csv can be read by check
+and family2pdf. The hall of fame, with the full reports, is written once
+the solve is over.
+"""
+import os
+import time
+import logging
+import tempfile
+
+from ortools.sat.python import cp_model
+
+from .deep import Individual
+
+log = logging.getLogger(__name__)
+
+
+class TimetableModel:
+
+    def __init__(self, index):
+        self.index = index
+        self.model = cp_model.CpModel()
+
+        # (group id, activity id) => (number of members that have the
+        # activity as a priority, number that have it as another
+        # activity).
+        self.wanted = {}
+        for (group, activity), members in sorted(
+                index.family_activity_campers.items()):
+            priorities = sum(1 for c in members
+                             if activity in index.camper_priorities[c])
+            self.wanted[(group, activity)] = (priorities,
+                                              len(members) - priorities)
+
+        # (group id, session id) => BoolVar, and session id => [(group
+        # id, BoolVar)].
+        self.x = {}
+        self.families = [[] for _ in range(index.num_sessions)]
+        for (group, activity) in self.wanted:
+            for s in index.activity_sessions[activity]:
+                var = self.model.NewBoolVar("x[{},{}]".format(group, s))
+                self.x[(group, s)] = var
+                self.families[s].append((group, var))
+
+        self.add_capacity()
+        self.add_once_per_activity()
+        self.add_no_overlap()
+        self.add_objective()
+
+    def size(self, group, activity):
+        return len(self.index.family_activity_campers[(group, activity)])
+
+    def add_capacity(self):
+        index = self.index
+        for s in range(index.num_sessions):
+            activity = index.session_activity[s]
+            in_session = sum(self.size(group, activity) * var
+                             for group, var in self.families[s])
+            self.model.Add(in_session <= int(index.session_limit[s]))
+            self.model.Add(in_session >= int(index.session_min[s]))
+
+    def add_once_per_activity(self):
+        for (group, activity) in self.wanted:
+            self.model.AddAtMostOne(
+                [self.x[(group, s)]
+                 for s in self.index.activity_sessions[activity]])
+
+    def add_no_overlap(self):
+        index = self.index
+        for (group, s), var in self.x.items():
+            for o in index.overlaps[s]:
+                if o > s and (group, o) in self.x:
+                    self.model.AddAtMostOne([var, self.x[(group, o)]])
+
+    def add_objective(self):
+        index = self.index
+        priority_weight = 1 + sum(others for _, others in self.wanted.values())
+        self.model.Maximize(sum(
+            (priority_weight * priorities + others) *
+            self.x[(group, s)]
+            for (group, activity), (priorities, others) in self.wanted.items()
+            for s in index.activity_sessions[activity]))
+
+    def genome(self, value):
+        """Return the genome (a list of bools) for a solution, value being
+        the solver's (or solution callback's) Value method."""
+        index = self.index
+        genome = [False] * (index.num_sessions * index.num_campers)
+        for (group, s), var in self.x.items():
+            if value(var):
+                for c in index.family_activity_campers[
+                        (group, index.session_activity[s])]:
+                    genome[s * index.num_campers + c] = True
+        return genome
+
+    def solve(self, time_limit=None, workers=None, callback=None):
+        """Solve the model, calling callback (a
+        cp_model.CpSolverSolutionCallback) with each improving solution.
+
+        Returns the name of the solver's status and the genome of the best
+        solution found, or None."""
+        solver = cp_model.CpSolver()
+        solver.parameters.num_workers = workers or os.cpu_count()
+        if time_limit is not None:
+            solver.parameters.max_time_in_seconds = time_limit
+
+        started = time.monotonic()
+        status = solver.Solve(self.model, callback)
+        found = status in (cp_model.OPTIMAL, cp_model.FEASIBLE)
+        log.info("CP-SAT {} in {:.1f}s, objective {}.".format(
+            solver.StatusName(status), time.monotonic() - started,
+            solver.ObjectiveValue() if found else None))
+
+        return (solver.StatusName(status),
+                self.genome(solver.Value) if found else None)
+
+
+def write_atomically(path, text):
+    """Replace the file at path with text, so that a reader sees either
+    the old file or the new one, never part of one."""
+    fd, tmp = tempfile.mkstemp(dir=os.path.dirname(path) or '.',
+                               prefix='.tmp-')
+    try:
+        with os.fdopen(fd, 'w') as f:
+            f.write(text)
+        os.replace(tmp, path)
+    except BaseException:
+        os.unlink(tmp)
+        raise
+
+
+class SolutionDumper(cp_model.CpSolverSolutionCallback):
+    """Write each solution the solver finds to best.csv (and its
+    violations to best_violations.csv) in outdir, and add it to
+    halloffame if one is given.
+
+    Every solution has a better objective than the last, so the files
+    always hold the best timetable found so far. make_individual turns a
+    genome into an Individual-like timetable with a fitness. With an
+    interval the files are written at most once every interval seconds
+    (and by finish() at the end), otherwise as each solution arrives."""
+
+    def __init__(self, model, make_individual, outdir, halloffame=None,
+                 interval=0.):
+        cp_model.CpSolverSolutionCallback.__init__(self)
+        self.model = model
+        self.make_individual = make_individual
+        self.outdir = outdir
+        self.halloffame = halloffame
+        self.interval = interval
+        self.solutions = 0
+        self.written = None
+        self.pending = None
+
+    def on_solution_callback(self):
+        self.solutions += 1
+        individual = self.make_individual(self.model.genome(self.Value))
+        if self.halloffame is not None:
+            self.halloffame.update([individual])
+        self.pending = individual
+        log.info("Solution {} after {:.1f}s, objective {}, fitness {}.".format(
+            self.solutions, self.WallTime(), self.ObjectiveValue(),
+            individual.fitness.values))
+
+        now = time.monotonic()
+        if self.written is None or now - self.written >= self.interval:
+            self.finish()
+            self.written = now
+
+    def finish(self):
+        """Write the latest solution if it has not been written yet."""
+        if self.pending is None:
+            return
+        timetable = Individual(self.pending, self.model.index.campers,
+                               self.model.index.sessions)
+        write_atomically(os.path.join(self.outdir, "best.csv"),
+                         timetable.export_cvs())
+        write_atomically(os.path.join(self.outdir, "best_violations.csv"),
+                         timetable.violations().to_csv())
+        self.pending = None
+
+
+def run(args):
+    from . import generate_schedule
+    from .deep import MyHallOfFame
+
+    outdir = args['<outdir>']
+    if not os.path.exists(outdir):
+        os.mkdir(outdir)
+
+    def make_individual(genome):
+        individual = generate_schedule.creator.Individual(genome)
+        individual.fitness.values = generate_schedule.toolbox.evaluate(
+            individual)
+        return individual
+
+    model = TimetableModel(generate_schedule.data_cache.index)
+    hof = MyHallOfFame(generate_schedule.campers, generate_schedule.sessions,
+                       outdir, 10)
+    dumper = SolutionDumper(model, make_individual, outdir, hof,
+                            interval=float(args['--write-interval']))
+    try:
+        status, genome = model.solve(
+            time_limit=(float(args['--time-limit']) * 60
+                        if args['--time-limit'] else None),
+            workers=int(args['--workers']) if args['--workers'] else None,
+            callback=dumper)
+    finally:
+        dumper.finish()
+        if len(hof):
+            hof.dump_to_dir()
+
+    if genome is None:
+        log.error("No timetable found ({}).".format(status))
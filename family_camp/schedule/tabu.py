@@ -0,0 +1,145 @@
+# coding: utf-8
+"""Tabu search engine ("generate --engine tabu").
+
+Each iteration scores every family move (see moves.py) of the
+neighbourhood incrementally with a DeltaEvaluator and makes the best one,
+even if it makes the timetable worse. A move takes the members of family
+F that asked for activity A out of the session they are in (if any) and
+puts them in another session of A, or leaves A out.
+
+Once (F, A) has been moved it is tabu for tenure iterations, so the
+search does not just undo the move, unless the move would give the best
+timetable found so far (the aspiration criterion).
+
+The neighbourhood is the moves of the activities of the families
+involved in the current violations (see FamilyMoves.problems), or with
+full=True the moves of every family and activity.
+
+The time taken to find the best timetable, and to find the first one
+without any violations, are logged so that the engines can be compared.
+"""
+import time
+import logging
+
+import numpy
+
+from .checkpoint import unpack_individuals
+from .bitgenome import pack
+from .delta import DeltaEvaluator
+from .moves import FamilyMoves, energy
+
+log = logging.getLogger(__name__)
+
+
+class TabuSearch:
+
+    def __init__(self, campers, sessions, index, weights, iterations=1000,
+                 tenure=10, full=False, time_limit=None):
+        self.evaluator = DeltaEvaluator(campers, sessions, index)
+        self.moves = FamilyMoves(self.evaluator, index, weights)
+        self.index = index
+        self.iterations = iterations
+        self.tenure = tenure
+        self.full = full
+        self.time_limit = time_limit
+
+        # group id => the activity ids the family asked for.
+        self.requests = {}
+        for group, activity in sorted(index.family_activity_campers):
+            self.requests.setdefault(group, []).append(activity)
+
+    def neighbourhood(self, genome, scores):
+        """Return the (group id, activity id) pairs whose moves are
+        scored."""
+        if self.full:
+            groups = sorted(self.requests)
+        else:
+            groups = sorted(set(group for group, _ in
+                                self.moves.problems(genome, scores)))
+        return [(group, activity) for group in groups
+                for activity in self.requests.get(group, [])]
+
+    def run(self, genome):
+        """Search from genome (a flat NumPy boolean array, changed in
+        place).
+
+        Returns the best genome found, its (fitness, goodness, bestness)
+        values and a dict of statistics about the search."""
+        evaluator = self.evaluator
+        moves = self.moves
+        scores = evaluator.full_scores(genome)
+        best_values = evaluator.values(scores)
+        best, best_genome = energy(best_values), genome.copy()
+
+        # (group id, activity id) => the iteration it is tabu until.
+        tabu = {}
+        started = time.monotonic()
+        stats = {'iterations': 0, 'time_to_best': 0.0,
+                 'time_to_feasible': 0.0 if best_values[0] == 1 else None}
+
+        for iteration in range(self.iterations):
+            if (self.time_limit is not None and
+                    time.monotonic() - started > self.time_limit):
+                break
+
+            chosen = None
+            for group, activity in self.neighbourhood(genome, scores):
+                is_tabu = tabu.get((group, activity), -1) >= iteration
+                for target in moves.targets(activity):
+                    flips = moves.flips(genome, group, activity, target)
+                    if not len(flips):
+                        continue
+                    new_scores, _ = moves.score(genome, scores, flips)
+                    moves.undo(genome, flips)
+                    values = evaluator.values(new_scores)
+                    e = energy(values)
+                    # Aspiration: a tabu move is allowed if it gives a new
+                    # best timetable.
+                    if is_tabu and e >= best:
+                        continue
+                    if chosen is None or e < chosen[0]:
+                        chosen = (e, values, new_scores, flips,
+                                  (group, activity))
+
+            stats['iterations'] = iteration + 1
+            if chosen is None:
+                break
+
+            e, values, scores, flips, move = chosen
+            genome[flips] = ~genome[flips]
+            tabu[move] = iteration + self.tenure
+
+            if e < best:
+                best, best_genome, best_values = e, genome.copy(), values
+                stats['time_to_best'] = time.monotonic() - started
+                log.debug("Iteration {}: energy {:.3f}.".format(iteration, e))
+                if values[0] == 1 and stats['time_to_feasible'] is None:
+                    stats['time_to_feasible'] = stats['time_to_best']
+
+        return best_genome, best_values, stats
+
+
+def run_tabu(start, individual_type, halloffame, **settings):
+    """Run a tabu search from the start individual and add the best
+    timetable found to halloffame. settings are passed on to TabuSearch.
+
+    Returns the best individual."""
+    from . import generate_schedule
+
+    search = TabuSearch(generate_schedule.campers, generate_schedule.sessions,
+                        generate_schedule.data_cache.index,
+                        generate_schedule.creator.FitnessMin.weights,
+                        **settings)
+    genome, values, stats = search.run(
+        numpy.fromiter(start, dtype=bool, count=len(start)))
+
+    log.info("Tabu search: {} iterations, best fitness {} after {:.1f}s, "
+             "time to feasible {}.".format(
+                 stats['iterations'], values, stats['time_to_best'],
+                 "{:.1f}s".format(stats['time_to_feasible'])
+                 if stats['time_to_feasible'] is not None else "not reached"))
+
+    best, = unpack_individuals([(pack(genome), values)], len(start),
+                               individual_type)
+    halloffame.update([best])
+    return best
@@ -156,57 +156,6 @@ def overlapping_sessions(session, sessions):
                     _, session))]
 
 
-def possible_family_arrangements_for_activity(activity, groups):
-    """Return the allowable arrangements of families for the given activity.
-    """
-
-    # Get the indexes for all families that requested this activity.
-    filtered_groups = [_ for _ in range(len(groups)) if len(groups[_].activities[activity.name]) > 0]
-
-    # - number of members of each family that want the activity
-    members = [len(groups[_].activities[activity.name]) for _ in filtered_groups]
-
-    solver = pywrapcp.Solver("Act")
-
-    # x = [ 0,1,1,0 ] - boolean for each family
-    x = [solver.IntVar(0, 1, "x%d" % i) for i in range(len(filtered_groups))]
-
-
-    #
-    # sum (a[i] * b[i] ) for all i <= limit of activity
-    solver.Add(solver.ScalProd(x, members) <= activity.limit)
-
-    all_solutions = solver.AllSolutionCollector()
-    all_solutions.Add(x)
-
-    db = solver.Phase(x,
-                      solver.INT_VAR_SIMPLE,
-                      solver.INT_VALUE_SIMPLE)
-
-    solver.Solve(db, all_solutions)
-
-    # Retrieve the solutions
-    number_solutions = all_solutions.SolutionCount()
-
-    print("Number of solutions for activity: {} - {}".format(number_solutions, activity.name))
-
-    #solution = solver.Assignment()
-
-    # build a list of the possible solutions.
-    options = [0] * number_solutions
-    for index in range(number_solutions):
-        solution = all_solutions.Solution(index)
-        option = [0] * len(groups)
-        for grp in range(len(filtered_groups)):
-            option[filtered_groups[grp]] = solution.Value(x[grp])
-        options[index] = option
-
-    solver.EndSearch()
-
-    return options
-
-
-
 def gen_test_data():
 
     a1 = Activity('a1',timedelta(minutes=59),10)
@@ -266,11 +215,22 @@ class SearchMonitorTest(pywrapcp.SearchMonitor):
         print("EndInitialPropagation: {}".format(self._nexts))
 
     def BeginFail(self):
-        print("BeginFail: {}".format([s.Value() for s in self._nexts]))
+        print("BeginFail: {}".format(self._nexts))
+
 
+# The solver and the variables of a timetable model, see build_model.
+Model = collections.namedtuple(
+    'Model', ['solver', 'slots', 'total', 'act_totals', 'act_session_index',
+              'sessions_by_activity'])
 
-def find_timetable(activities, activity_selection_options,
-                   sessions, campers, groups):
+
+def build_model(activities, sessions, groups, profile_file=None):
+    """Build the constraint model for the timetable.
+
+    There is a 0/1 slot for each (activity, session, family). The size of
+    each session is limited by a linear (knapsack) constraint on the
+    number of family members that want the activity, rather than by
+    listing every subset of the families that fits."""
     num_acts = len(activities)
     num_sessions = len(sessions)
     num_groups = len(groups)
@@ -296,18 +256,20 @@ def find_timetable(activities, activity_selection_options,
     #    for j in len(acts):
     #       sum(x[i]+x[j*len(groups)*len(sessions)+i])
 
-    solver_params = pywrapcp.SolverParameters()
-    # Change the profile level
-    solver_params.profile_level = pywrapcp.SolverParameters.NORMAL_PROFILING
-    solver_params.profile_file = "/home/rjt/Devel/Personal/Cubs/family_camp/profile.txt"
-    solver_params.export_file = True
-
+    solver_params = pywrapcp.Solver.DefaultSolverParameters()
+    if profile_file is not None:
+        solver_params.profile_propagation = True
+        solver_params.profile_file = profile_file
 
     solver = pywrapcp.Solver("Timetable", solver_params)
 
+    # Get a list of the number of members of each group that want to do each activity.
+    members = [ [len(g.activities[act.name]) for g in groups]
+               for act in activities ]
 
-
-    slots = [solver.IntVar(0, 1, "x({},{},{})".format(act, sess, grp))
+    # A family can only be put in the sessions of activities it asked for.
+    slots = [solver.IntVar(0, 1 if members[act][grp] else 0,
+                           "x({},{},{})".format(act, sess, grp))
              for act in range(num_acts)
              for sess in range(sessions_by_activity[act])
              for grp in range(num_groups)]
@@ -344,25 +306,11 @@ def find_timetable(activities, activity_selection_options,
                       for overlap_indx in range(len(overlaps)) ]
                       for grp in range(num_groups) ]
 
-    # Get a list of the number of members of each group that want to do each activity.
-    members = [ [len(g.activities[act.name]) for g in groups]
-               for act in activities ]
-
-    #
-    # Setup the allowed assignments for each session. We only allow assignments of families that are valid
-    # i.e. they only include groups that actually requested the activity and they do not exceed the allowed
-    # activity limit of participants.
-    for act in range(len(activities)):
-        for sess in range(len(act_sessions[act])):
-            solver.AllowedAssignments(act_sessions[act][sess],
-                                      activity_selection_options[act])
-
     # Contraint to ensure that each activity session does not exceed the maximum number of allowed
-    # participants. (this is not required if we use the allowed assignments above because they
-    # only include sessions schedules that are below the activity limit.
-    #for act in range(num_acts):
-    #    for session in act_sessions[act]:
-    #        solver.Add(solver.ScalProd(session, members[act]) <= activities[act].limit)
+    # participants.
+    for act in range(num_acts):
+        for session in act_sessions[act]:
+            solver.Add(solver.ScalProd(session, members[act]) <= activities[act].limit)
 
     # Constraint to ensure that no family does the same activity twice.
     for act in range(num_acts):
@@ -411,6 +359,17 @@ def find_timetable(activities, activity_selection_options,
 
     print('Trying for total of: {}'.format(total_requested_activities))
 
+    return Model(solver, slots, total, act_totals, act_session_index,
+                 sessions_by_activity)
+
+
+def find_timetable(activities, sessions, campers, groups, profile_file=None):
+    (solver, slots, total, act_totals, act_session_index,
+     sessions_by_activity) = build_model(activities, sessions, groups,
+                                         profile_file)
+    num_acts = len(activities)
+    num_groups = len(groups)
+
     limit = solver.SolutionsLimit(1)
 
     db = solver.Phase(slots,
@@ -423,7 +382,7 @@ def find_timetable(activities, activity_selection_options,
     solution.Add(act_totals)
 
 
-    monitor = SearchMonitorTest(solver, slots, act_products)
+    monitor = SearchMonitorTest(solver, slots, act_totals)
     logger = solver.SearchLog(1000000)
 
     collector = solver.LastSolutionCollector(solution)
@@ -506,10 +465,8 @@ def find_timetable(activities, activity_selection_options,
     solver.EndSearch()
 
 
-#(activities, sessions, campers, groups) = get_source_data(limit_campers=10)
-(activities, sessions, campers, groups) = gen_test_data()
-
-activity_selection_options = [possible_family_arrangements_for_activity(
-    activities[_], groups) for _ in range(len(activities))]
+if __name__ == '__main__':
+    #(activities, sessions, campers, groups) = get_source_data(limit_campers=10)
+    (activities, sessions, campers, groups) = gen_test_data()
 
-find_timetable(activities, activity_selection_options, sessions, campers, groups)
\ No newline at end of file
+    find_timetable(activities, sessions, campers, groups)
\ No newline at end of file
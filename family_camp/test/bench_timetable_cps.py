@@ -0,0 +1,81 @@
+"""Benchmark building the timetable_cps model as the number of families
+grows.
+
+Prints the time taken and the peak Python memory (from tracemalloc, so
+not counting the solver's own allocations) used to build the model for
+10 to 100 families, along with the number of family subsets that fit in
+the busiest activity's sessions, which is the size of the table that
+the old AllowedAssignments formulation had to enumerate for each of its
+sessions.
+
+  python -m family_camp.test.bench_timetable_cps
+"""
+import io
+import random
+import time
+import tracemalloc
+from contextlib import redirect_stdout
+from datetime import datetime, timedelta
+
+from family_camp.schedule.timetable_cps import (
+    Activity, Session, Group, Camper, build_model)
+
+
+def gen_data(num_families, rng, num_activities=6, sessions_per_activity=3):
+    """Return random activities, sessions, campers and groups."""
+    activities = [Activity('a{}'.format(i), timedelta(minutes=59),
+                           rng.randint(20, 30))
+                  for i in range(num_activities)]
+
+    start = datetime(2016, 1, 1, 9)
+    sessions = [Session(act, act.name,
+                        start + timedelta(hours=sess, minutes=10 * i))
+                for i, act in enumerate(activities)
+                for sess in range(sessions_per_activity)]
+
+    groups = [Group('g{}'.format(i)) for i in range(num_families)]
+    campers = [Camper('c{}-{}'.format(i, j), group,
+                      rng.sample(activities, 2), [])
+               for i, group in enumerate(groups)
+               for j in range(rng.randint(1, 6))]
+
+    return activities, sessions, campers, groups
+
+
+def count_subsets(sizes, limit):
+    """Return the number of subsets of sizes that add up to at most
+    limit."""
+    counts = [1] + [0] * limit
+    for size in sizes:
+        for total in range(limit, size - 1, -1):
+            counts[total] += counts[total - size]
+    return sum(counts)
+
+
+def main():
+    rng = random.Random(1)
+    print("{:>8} {:>10} {:>12} {:>20}".format(
+        "families", "build (s)", "peak (KiB)", "subsets (old table)"))
+
+    for num_families in range(10, 101, 10):
+        activities, sessions, campers, groups = gen_data(num_families, rng)
+
+        tracemalloc.start()
+        started = time.perf_counter()
+        with redirect_stdout(io.StringIO()):
+            build_model(activities, sessions, groups)
+        elapsed = time.perf_counter() - started
+        _, peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+
+        subsets = max(count_subsets([len(g.activities[act.name])
+                                     for g in groups
+                                     if g.activities[act.name]], act.limit)
+                      for act in activities)
+
+        print("{:>8} {:>10.3f} {:>12.0f} {:>20}".format(
+            num_families, elapsed, peak / 1024, subsets))
+
+
+if __name__ == '__main__':
+    main()
@@ -34,8 +34,13 @@ except ImportError:
     collections.MutableMapping = collections.abc.MutableMapping
     from scoop import futures
 
+import copy
+import json
+import random
+import sys
 from functools import partial
 
+import pytest
 from docopt import docopt
 from deap import base, creator, tools
 from deap.algorithms import varAnd, varOr
@@ -45,12 +50,36 @@ import numpy
 from deap.tools import Statistics
 
 from family_camp.schedule.deep import *
+from family_camp.schedule.numpy_fitness import NumpyEvaluator
+from family_camp.schedule.delta import DeltaEvaluator
+from family_camp.schedule.bitgenome import BitGenome
+from family_camp.schedule.fitness_cache import FitnessCache, genome_key
+from family_camp.schedule.report import (
+    Clash, OtherNotMet, SplitFamily, OverLimit, UnderMinimum)
+from family_camp.schedule.checkpoint import save_checkpoint, load_checkpoint
+from family_camp.schedule.evolution import (
+    StoppingCriteria, ea_simple, evaluate_invalid)
+from family_camp.schedule.islands import migrate, migration_order
+from family_camp.schedule.backends import (
+    chunked, make_backend, register_evaluator, setup_backend, unwrap)
+from family_camp.schedule.repair import Repair
+from family_camp.schedule.seeding import (
+    seed_population, mean_hamming_distance, random_greedy_seed)
+from family_camp.schedule.greedy import greedy_schedule, family_order
+from family_camp.schedule.perf import PhaseTimer, PerfLog
+from family_camp.schedule.anneal import Annealer
+from family_camp.schedule.tabu import TabuSearch
+from family_camp.schedule.moves import FamilyMoves, energy
 
 log = logging.getLogger(__name__)
 
 DATEFORMAT = "%a %H:%M"
 CACHE = ".cache.pickle"
 
+# The shared backend uses multiprocessing.shared_memory.
+needs_shared_memory = pytest.mark.skipif(
+    sys.version_info < (3, 8), reason="needs Python 3.8 or later")
+
 
 def eaSimple(population, toolbox, cxpb, mutpb, ngen, stats=None,
              halloffame=None, verbose=__debug__):
@@ -257,6 +286,11 @@ data_cache.overlapping_sessions = {
     session: get_overlapping_sessions(session, sessions) for session in sessions
 }
 
+data_cache.index = ProblemIndex(campers, sessions)
+
+random.seed(1)
+numpy.random.seed(1)
+
 timetable = [numpy.random.choice([True, False])
              for _ in range(0, len(campers) * len(sessions))]
 
@@ -264,6 +298,7 @@ toolbox = base.Toolbox()
 
 creator.create("FitnessMin", base.Fitness, weights=(5.0, -2.0, 1.0))
 creator.create("Individual", list, fitness=creator.FitnessMin)
+creator.create("PackedIndividual", BitGenome, fitness=creator.FitnessMin)
 toolbox.register("individual", partial(gen_individual, toolbox=toolbox),
                  gen_seed_individual(campers, sessions,
                                      data_cache=data_cache,
@@ -281,6 +316,558 @@ toolbox.register("evaluate", partial(evaluate, campers=campers,
                                      sessions=sessions))
 toolbox.register("map", futures.map)
 
+
+@pytest.fixture(autouse=True)
+def seed_random():
+    """Give every test the same random numbers, however it is run."""
+    random.seed(1)
+    numpy.random.seed(1)
+
+
+def test_overlap_map_matches_pairwise_definition():
+    check_overlaps(data_cache.index)
+
+    # Back to back, nested and identical sessions.
+    others = [Session(Maze, "Maze", datetime(2014, 7, 5, 9, 0)),
+              Session(Maze, "Maze", datetime(2014, 7, 5, 9, 30)),
+              Session(Maze, "Maze", datetime(2014, 7, 5, 10, 0)),
+              Session(Maze, "Maze", datetime(2014, 7, 5, 9, 0)),
+              Session(Archery, "Archery", datetime(2014, 7, 5, 9, 10)),
+              Session(Archery, "Archery", datetime(2014, 7, 6, 9, 10))]
+    check_overlaps(ProblemIndex(campers, others))
+
+
+def test_fused_evaluate_matches_individual_methods():
+    for individual in [toolbox.individual() for _ in range(20)] + [timetable]:
+        ind = Individual(individual, campers, sessions)
+        bestness = ind.bestness()
+        assert evaluate(individual, campers, sessions) == (
+            1. / ind.fitness(),
+            1. / ind.goodness(campers),
+            (1. / bestness) if bestness != 0 else 0)
+
+
+def test_numpy_evaluator_matches_evaluate():
+    evaluator = NumpyEvaluator(campers, sessions)
+    for _ in range(20):
+        individual = toolbox.individual()
+        assert evaluator(individual) == evaluate(individual, campers, sessions)
+
+    assert evaluator(timetable) == evaluate(timetable, campers, sessions)
+
+
+def test_evaluate_population_matches_evaluate():
+    evaluator = NumpyEvaluator(campers, sessions)
+    population = [toolbox.individual() for _ in range(20)] + [timetable]
+
+    assert evaluator.evaluate_population(population, chunk_size=8) == [
+        evaluate(individual, campers, sessions) for individual in population]
+
+
+def test_packed_individual_behaves_like_list():
+    individual = toolbox.individual()
+    packed = creator.PackedIndividual(individual)
+
+    assert len(packed) == len(individual)
+    assert list(packed) == list(individual)
+    assert packed == individual
+    assert packed[3:17] == individual[3:17]
+    assert packed.count(True) == individual.count(True)
+    assert evaluate(packed, campers, sessions) == evaluate(
+        individual, campers, sessions)
+
+    mutant = toolbox.mutate(packed)[0]
+    assert isinstance(mutant, creator.PackedIndividual)
+    assert NumpyEvaluator(campers, sessions)(mutant) == evaluate(
+        mutant, campers, sessions)
+
+    packed[0] = not packed[0]
+    assert packed != individual
+
+
+def test_delta_evaluator_matches_evaluate():
+    evaluator = DeltaEvaluator(campers, sessions)
+    population = [toolbox.individual() for _ in range(10)]
+    for individual in population:
+        individual.fitness.values = evaluator(individual)
+
+    for _ in range(10):
+        population = [toolbox.mutate(individual)[0]
+                      for individual in population]
+        for individual in population:
+            assert individual.partial_scores is not None
+            values = evaluator(individual)
+            assert values == evaluate(individual, campers, sessions)
+            individual.fitness.values = values
+
+
+def test_fitness_cache():
+    individual = toolbox.individual()
+    packed = creator.PackedIndividual(individual)
+    assert genome_key(individual) == genome_key(packed)
+
+    cache = FitnessCache(maxsize=2)
+    key = genome_key(individual)
+    assert cache.get(key) is None
+    cache.put(key, evaluate(individual, campers, sessions))
+    assert cache.get(key) == evaluate(individual, campers, sessions)
+    assert (cache.hits, cache.misses) == (1, 1)
+
+    # The least recently used value is dropped first.
+    cache.put(b'a', (1, 1, 1))
+    cache.get(key)
+    cache.put(b'b', (2, 2, 2))
+    assert len(cache) == 2
+    assert cache.get(b'a') is None
+    assert cache.get(key) is not None
+
+
+def test_violation_report_matches_fitness():
+    for individual in [toolbox.individual() for _ in range(10)] + [timetable]:
+        ind = Individual(individual, campers, sessions)
+        report = ind.violations()
+        assert report.penalty() + 1 == ind.fitness()
+        assert len(report.of_kind(Clash)) % 2 == 0
+        assert all(_.penalty == 0 for _ in report.of_kind(OtherNotMet))
+
+        rows = report.to_csv().splitlines()
+        assert len(rows) == len(report.records) + 1
+        assert len(json.loads(report.to_json())) == len(report.records)
+
+
+def test_session_inst_bitsets():
+    ind = Individual(toolbox.individual(), campers, sessions)
+    for inst in ind.session_inst:
+        assert [c for c in campers if inst.has_camper(c)] == inst.campers
+        assert bin(inst.camper_bits).count("1") == len(inst.campers)
+        assert all(inst.has_group(c.group) for c in inst.campers)
+
+    inst = SessionInst(sessions[0], campers, [False] * len(campers))
+    inst.add_camper(campers[3])
+    assert inst.has_camper(campers[3]) and not inst.has_camper(campers[0])
+    assert inst.family_groups == {campers[3].group}
+    assert bin(inst.group_bits).count("1") == 1
+
+
+def test_checkpoint_round_trip(tmp_path):
+    population = [toolbox.individual() for _ in range(5)]
+    for individual in population:
+        individual.fitness.values = toolbox.evaluate(individual)
+    hof = HallOfFame(2)
+    hof.update(population)
+    logbook = tools.Logbook()
+    logbook.record(gen=7, nevals=5)
+
+    path = str(tmp_path / "checkpoint.pickle")
+    save_checkpoint(path, 7, population, hof, logbook)
+    expected = random.random()
+
+    for individual_type in [creator.Individual, creator.PackedIndividual]:
+        restored_hof = HallOfFame(2)
+        gen, restored, restored_logbook = load_checkpoint(
+            path, individual_type, restored_hof)
+
+        assert random.random() == expected
+        assert gen == 7
+        assert restored_logbook.select('gen') == [7]
+        assert all(isinstance(_, individual_type) for _ in restored)
+        assert [list(_) for _ in restored] == [list(_) for _ in population]
+        assert [_.fitness.values for _ in restored] == [
+            _.fitness.values for _ in population]
+        assert [list(_) for _ in restored_hof] == [list(_) for _ in hof]
+
+
+def scored(violations, percentage_met):
+    """Return an empty individual with the fitness of a timetable with
+    this many violations and percentage of the other activities met."""
+    individual = creator.Individual()
+    individual.fitness.values = (1. / (violations + 1), 1. / percentage_met,
+                                 0)
+    return individual
+
+
+def test_stopping_criteria_targets():
+    stop = StoppingCriteria()
+    assert stop(1, scored(0, 100.)) is None
+
+    stop = StoppingCriteria(target_fitness=1)
+    assert stop(1, scored(1, 100.)) is None
+    assert stop(2, scored(0, 10.)) == (
+        "reached the target (0 violations, 10.00% met)")
+
+    # The violation count is rounded after taking the reciprocal.
+    stop = StoppingCriteria(target_fitness=3)
+    best = creator.Individual()
+    best.fitness.values = (1. / 3.4, 1. / 50., 0)
+    assert stop(1, best) is not None
+    best.fitness.values = (1. / 3.6, 1. / 50., 0)
+    assert stop(2, best) is None
+
+    stop = StoppingCriteria(target_goodness=80.)
+    assert stop(1, scored(5, 79.9)) is None
+    assert stop(2, scored(5, 80.)) is not None
+
+    stop = StoppingCriteria(target_fitness=1, target_goodness=80.)
+    assert stop(1, scored(0, 70.)) is None
+    assert stop(2, scored(1, 90.)) is None
+    assert stop(3, scored(0, 80.)) is not None
+
+
+def test_stopping_criteria_stagnation_and_time_limit():
+    stop = StoppingCriteria(stagnation=3)
+    assert stop(0, scored(2, 50.)) is None
+    # An equal fitness is not an improvement.
+    assert stop(1, scored(2, 50.)) is None
+    assert stop(2, scored(1, 50.)) is None
+    assert stop(4, scored(1, 50.)) is None
+    assert stop(5, scored(2, 60.)) == "no improvement since generation 2"
+    assert stop.best_gen == 2
+
+    stop = StoppingCriteria(time_limit=60)
+    assert stop(1, scored(2, 50.)) is None
+    stop.started -= 61
+    assert stop(2, scored(2, 50.)) == "time limit of 60s reached"
+
+
+def test_ea_simple_stops_early_and_checkpoints():
+    calls = []
+
+    def checkpoint(gen, population, halloffame, logbook, force=False):
+        calls.append((gen, force))
+
+    population = [toolbox.individual() for _ in range(10)]
+    population, logbook = ea_simple(
+        population, toolbox, cxpb=0.5, mutpb=0.2, ngen=10, verbose=False,
+        stop=StoppingCriteria(time_limit=0), checkpoint=checkpoint)
+
+    assert logbook.select('gen') == [0, 1]
+    assert calls == [(1, False), (1, True)]
+    assert all(_.fitness.valid for _ in population)
+
+
+def test_island_migration():
+    assert migration_order(3, 'ring', random) == [1, 2, 0]
+    for _ in range(10):
+        order = migration_order(4, 'random', random)
+        assert sorted(order) == [0, 1, 2, 3]
+        assert all(i != j for i, j in enumerate(order))
+
+    islands = [[toolbox.individual() for _ in range(4)] for _ in range(2)]
+    for island in islands:
+        for individual in island:
+            individual.fitness.values = toolbox.evaluate(individual)
+    best = [max(island, key=lambda _: _.fitness) for island in islands]
+
+    migrate(islands, 1, [1, 0])
+    assert all(len(island) == 4 for island in islands)
+    assert best[0] in islands[1] and best[1] in islands[0]
+
+
+def test_backends_match_serial_map():
+    assert chunked(list(range(10)), 3) == [[0, 1, 2, 3], [4, 5, 6, 7], [8, 9]]
+    assert chunked([], 4) == []
+
+    evaluator = NumpyEvaluator(campers, sessions)
+    population = [toolbox.individual() for _ in range(9)]
+    expected = [evaluator(_) for _ in population]
+
+    for name in ['serial', 'process']:
+        backend = make_backend(name, evaluator, workers=2)
+        try:
+            assert backend.map(evaluator, population) == expected
+            assert backend.map(len, population) == [len(_) for _ in population]
+        finally:
+            backend.close()
+
+
+@needs_shared_memory
+def test_shared_backend_matches_serial_map():
+    evaluator = NumpyEvaluator(campers, sessions)
+    population = [toolbox.individual() for _ in range(9)]
+    expected = [evaluator(_) for _ in population]
+
+    backend = make_backend('shared', evaluator, workers=2)
+    try:
+        packed = [creator.PackedIndividual(_) for _ in population]
+        assert backend.evaluate_population(population) == expected
+        assert backend.evaluate_population(packed[:4]) == expected[:4]
+        assert backend.evaluate_population(packed + packed) == expected * 2
+    finally:
+        backend.close()
+
+
+def test_shared_backend_needs_python_3_8(monkeypatch):
+    monkeypatch.setattr(sys, 'version_info', (3, 7, 9))
+    with pytest.raises(ValueError, match="Python 3.8"):
+        make_backend('shared', NumpyEvaluator(campers, sessions))
+
+
+@pytest.mark.parametrize("evaluator_name, backend_name, used", [
+    ('python', 'process', 'process'),
+    ('numpy', 'process', 'process'),
+    ('batch', 'process', 'process'),
+    ('batch', 'scoop', 'scoop'),
+    ('batch', 'serial', 'serial'),
+    pytest.param('numpy', 'shared', 'shared', marks=needs_shared_memory),
+    pytest.param('batch', 'shared', 'shared', marks=needs_shared_memory),
+    ('delta', 'process', 'serial')])
+def test_setup_backend_with_registered_evaluators(evaluator_name,
+                                                  backend_name, used):
+    population = [toolbox.individual() for _ in range(6)]
+    expected = [creator.FitnessMin(evaluate(_, campers, sessions)).values
+                for _ in population]
+
+    toolbox_ = base.Toolbox()
+    evaluator = register_evaluator(evaluator_name, toolbox_, campers,
+                                   sessions)
+    backend = setup_backend(backend_name, toolbox_, evaluator, workers=2)
+    try:
+        assert backend.name == used
+        if evaluator_name == 'batch' and used != 'serial':
+            # The generation is scored by the backend's workers.
+            assert (unwrap(toolbox_.evaluate_population) ==
+                    backend.evaluate_population)
+        individuals = [toolbox.clone(_) for _ in population]
+        assert evaluate_invalid(individuals, toolbox_) == 6
+        assert [_.fitness.values for _ in individuals] == expected
+    finally:
+        backend.close()
+
+
+def test_mate_swaps_whole_family_schedules():
+    index = data_cache.index
+
+    def schedules(individual):
+        x = numpy.array(list(individual), dtype=bool).reshape(
+            index.num_sessions, index.num_campers)
+        return [frozenset(index.session_activity[s]
+                          for s in numpy.flatnonzero(x[:, c]))
+                for c in range(index.num_campers)]
+
+    evaluator = DeltaEvaluator(campers, sessions)
+    for individual_type in [creator.Individual, creator.PackedIndividual]:
+        parents = [individual_type(toolbox.individual()) for _ in range(2)]
+        for parent in parents:
+            parent.fitness.values = evaluator(parent)
+        before = [schedules(_) for _ in parents]
+
+        children = toolbox.mate(*[toolbox.clone(_) for _ in parents])
+
+        for child in children:
+            assert not child.fitness.valid
+            # Every family keeps the activities from one of the parents
+            # and the delta evaluator can follow the changes.
+            after = schedules(child)
+            for members in index.group_campers:
+                assert any(all(after[c] == parent[c] for c in members)
+                           for parent in before)
+            assert evaluator(child) == evaluate(child, campers, sessions)
+
+
+def test_repair_capacity_keeps_families_together():
+    index = copy.copy(data_cache.index)
+    index.session_limit = index.session_limit.copy()
+    index.session_limit[6] = 2
+
+    # Camper 0 is in an overfull session of activity 3, the other
+    # sessions of which overlap sessions 5 and 2 that camper 1 (the rest
+    # of the family) is in.
+    x = numpy.zeros((index.num_sessions, index.num_campers), dtype=bool)
+    x[6, [0, 2, 3]] = True
+    x[[5, 2], 1] = True
+    before = x.copy()
+    repair_capacity(x, index, [0])
+    assert (x == before).all()
+
+    # Session 8 is free once camper 1 is not in session 2.
+    x[2, 1] = False
+    repair_capacity(x, index, [0])
+    assert not x[6, 0] and x[8, 0]
+
+
+def test_repair_improves_and_scores_individual():
+    repair = Repair(campers, sessions, data_cache.index,
+                    creator.FitnessMin.weights, max_moves=5)
+    for individual_type in [creator.Individual, creator.PackedIndividual]:
+        individual = individual_type(toolbox.individual())
+        individual.fitness.values = evaluate(individual, campers, sessions)
+
+        repaired, = repair(toolbox.clone(individual))
+        again, = repair(toolbox.clone(individual))
+
+        assert repaired.fitness >= individual.fitness
+        # Compare after the same trip through the fitness weights.
+        assert repaired.fitness.values == creator.FitnessMin(
+            evaluate(repaired, campers, sessions)).values
+        assert list(repaired) == list(again)
+
+    # Without a limit the climb carries on until no move improves the
+    # timetable, so a second climb makes no moves.
+    repair = Repair(campers, sessions, data_cache.index,
+                    creator.FitnessMin.weights, max_moves=None)
+    repaired, = repair(creator.Individual(toolbox.individual()))
+    genome = numpy.array(list(repaired), dtype=bool)
+    _, made = repair.climb(genome, repair.evaluator.full_scores(genome))
+    assert made == 0
+
+
+def test_seed_population():
+    imported = list(timetable)
+    population = seed_population(toolbox, creator.PackedIndividual, 12,
+                                 data_cache.index, 3, [imported])
+
+    assert len(population) == 12
+    assert all(isinstance(_, creator.PackedIndividual) for _ in population)
+    assert list(population[0]) == imported
+
+    pairs = [(a, b) for i, a in enumerate(population)
+             for b in population[i + 1:]]
+    expected = sum(sum(x != y for x, y in zip(a, b))
+                   for a, b in pairs) / len(pairs)
+    assert abs(mean_hamming_distance(population) - expected) < 1e-9
+
+    for seed in range(10):
+        report = Individual(random_greedy_seed(data_cache.index, seed),
+                            campers, sessions).violations()
+        for kind in (Clash, SplitFamily, OverLimit):
+            assert not report.of_kind(kind)
+
+
+def test_greedy_schedule():
+    genome = greedy_schedule(data_cache.index)
+    assert genome == greedy_schedule(data_cache.index)
+
+    report = Individual(genome, campers, sessions).violations()
+    for kind in (Clash, SplitFamily, OverLimit):
+        assert not report.of_kind(kind)
+
+    # Both families want four sessions, but session 0 of activity 0 and
+    # session 4 of activity 2 overlap, so family 1 has only two that
+    # cannot clash with its other activity and goes first.
+    requests = [[] for _ in data_cache.index.group_campers]
+    requests[0] = [(0, [0], False), (1, [0], False)]
+    requests[1] = [(0, [2], False), (2, [2], False)]
+    assert family_order(data_cache.index, requests)[:2] == [1, 0]
+
+
+def test_perf_log(tmp_path):
+    timer = PhaseTimer()
+    for _ in range(2):
+        with timer('evaluate'):
+            pass
+    phases = timer.reset()
+    assert list(phases) == ['evaluate'] and timer.times == {}
+
+    population = [toolbox.individual() for _ in range(3)]
+    path = str(tmp_path / "perf.jsonl")
+    perf = PerfLog(path, backend='serial')
+    perf.record(1, 3, phases, population, hits=1, misses=3)
+    perf.close()
+
+    with open(path) as f:
+        start, record = [json.loads(_) for _ in f]
+    assert start['event'] == 'start' and start['backend'] == 'serial'
+    assert record['gen'] == 1 and record['hit_rate'] == 0.25
+    assert record['population_bytes'] > 0
+    assert record['evals_per_sec'] == 3 / phases['evaluate']
+
+
+def test_annealer():
+    annealer = Annealer(campers, sessions, data_cache.index,
+                        creator.FitnessMin.weights, steps=300,
+                        start_temperature=0.5)
+    assert annealer.temperature(0) == 0.5
+    assert abs(annealer.temperature(300) - 0.01) < 1e-12
+
+    start = numpy.array(toolbox.individual(), dtype=bool)
+    best, values, _ = annealer.run(start.copy(), random.Random(1))
+
+    assert values == evaluate(best.tolist(), campers, sessions)
+    assert energy(values) <= energy(evaluate(start.tolist(), campers,
+                                             sessions))
+
+    # With no move that changes the timetable the annealer stops.
+    annealer.moves.flips = lambda *args: numpy.array([], dtype=int)
+    assert annealer.random_move(start, random.Random(1), tries=10) is None
+    best, values, accepted = annealer.run(start.copy(), random.Random(1))
+    assert accepted == 0 and (best == start).all()
+
+    annealer.requests = []
+    assert annealer.random_move(start, random.Random(1)) is None
+
+
+def test_family_move_flips():
+    index = data_cache.index
+    moves = FamilyMoves(DeltaEvaluator(campers, sessions, index), index,
+                        creator.FitnessMin.weights)
+    genome = numpy.array(toolbox.individual(), dtype=bool)
+
+    for (group, activity), wanted in index.family_activity_campers.items():
+        for target in moves.targets(activity):
+            after = genome.copy()
+            flips = moves.flips(after, group, activity, target)
+            after[flips] = ~after[flips]
+
+            x = moves.matrix(after)
+            choices = index.activity_sessions[activity]
+            members = index.group_campers[group]
+            for s in choices:
+                expected = [s == target and c in wanted for c in members]
+                assert x[s, members].tolist() == expected
+            # Nothing else changes.
+            before = moves.matrix(genome)
+            others = [s for s in range(index.num_sessions)
+                      if s not in choices]
+            assert (x[others] == before[others]).all()
+
+
+def test_tabu_search():
+    search = TabuSearch(campers, sessions, data_cache.index,
+                        creator.FitnessMin.weights, iterations=2)
+    start = numpy.array(greedy_schedule(data_cache.index), dtype=bool)
+    best, values, stats = search.run(start.copy())
+
+    assert stats['iterations'] == 2
+    assert values == evaluate(best.tolist(), campers, sessions)
+    assert energy(values) <= energy(evaluate(start.tolist(), campers,
+                                             sessions))
+
+
+def test_solve_streams_timetables_that_meet_the_hard_constraints(tmp_path):
+    from family_camp.schedule.solve_schedule import (
+        TimetableModel, SolutionDumper)
+
+    class Hall(list):
+
+        def update(self, individuals):
+            self.extend(individuals)
+
+    def make_individual(genome):
+        individual = creator.Individual(genome)
+        individual.fitness.values = evaluate(individual, campers, sessions)
+        return individual
+
+    model = TimetableModel(data_cache.index)
+    hall = Hall()
+    dumper = SolutionDumper(model, make_individual, str(tmp_path), hall)
+    status, genome = model.solve(time_limit=5, workers=1, callback=dumper)
+    dumper.finish()
+
+    assert status in ('OPTIMAL', 'FEASIBLE')
+    assert dumper.solutions == len(hall) > 0
+    assert list(hall[-1]) == genome
+
+    # Only the best timetable is written, under the same names each time.
+    assert sorted(_.name for _ in tmp_path.iterdir()) == [
+        'best.csv', 'best_violations.csv']
+    timetable = Individual(genome, campers, sessions)
+    assert (tmp_path / 'best.csv').read_text() == timetable.export_cvs()
+
+    report = timetable.violations()
+    for kind in (Clash, SplitFamily, OverLimit, UnderMinimum):
+        assert not report.of_kind(kind)
+
+
 if __name__ == '__main__':
 
     args = docopt(__doc__, version='1.0')